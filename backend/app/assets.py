@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PIL import Image
+
+ASSET_CACHE_MB = int(os.environ.get("CREATIVEOS_ASSET_CACHE_MB", 256))
+
+
+def _image_bytes(img: Image.Image) -> int:
+    return img.width * img.height * len(img.getbands())
+
+
+class AssetCache:
+    """
+    In-memory LRU of decoded RGBA sources and resized tiles, bounded by
+    total pixel bytes.
+
+    Keys are (path, mtime_ns, width, height, reduce). Sources have
+    width/height None and reduce = the downsampling factor (1 for untouched);
+    tiles have their size and reduce = whether they came from a preview
+    reduction. Editing a file on disk changes its mtime, so it naturally
+    misses. Returned images are shared between callers and must be treated
+    as read-only.
+    """
+
+    def __init__(self, max_bytes: int = ASSET_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Tuple, Image.Image]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key) -> Optional[Image.Image]:
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return img
+
+    def _put(self, key, img: Image.Image):
+        size = _image_bytes(img)
+        if size > self.max_bytes:
+            return  # would just evict everything else
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._total -= _image_bytes(old)
+            self._items[key] = img
+            self._total += size
+            while self._total > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._total -= _image_bytes(evicted)
+                self.evictions += 1
+
+    def get_source(self, path: Path) -> Image.Image:
+        """Decoded RGBA image for `path`."""
+        key = (str(path), os.stat(path).st_mtime_ns, None, None, 1)
+        img = self._get(key)
+        if img is None:
+            with Image.open(path) as f:
+                img = f.convert("RGBA")
+            self._put(key, img)
+        return img
+
+    def get_reduced(self, path: Path, factor: int) -> Image.Image:
+        """
+        `path` downsampled by an integer `factor`. Reuses a cached full-size
+        source if there is one; otherwise JPEGs are decoded straight at the
+        smaller size (DCT scaling) and the full size is never materialized.
+        """
+        if factor <= 1:
+            return self.get_source(path)
+        mtime = os.stat(path).st_mtime_ns
+        key = (str(path), mtime, None, None, factor)
+        img = self._get(key)
+        if img is not None:
+            return img
+        with self._lock:
+            src = self._items.get((str(path), mtime, None, None, 1))
+        if src is not None:
+            img = src.reduce(factor)
+        else:
+            with Image.open(path) as f:
+                target = (max(1, f.width // factor), max(1, f.height // factor))
+                f.draft("RGB", target)
+                img = f.convert("RGBA")
+            # draft() only gets within a power of two; finish with a box filter
+            if img.size != target:
+                img = img.resize(target, Image.Resampling.BOX)
+        self._put(key, img)
+        return img
+
+    def get_tile(self, path: Path, width: int, height: int, reduced: bool = False) -> Image.Image:
+        """
+        `path` decoded and LANCZOS-resized to width x height. With `reduced`,
+        the resize starts from the smallest cached power-of-two reduction
+        that is still at least the tile size (cheaper, for previews).
+        """
+        width, height = max(1, int(width)), max(1, int(height))
+        # The reduction follows from the source and tile size, so the key only
+        # needs `reduced`; the header is read just on a miss
+        key = (str(path), os.stat(path).st_mtime_ns, width, height, reduced)
+        img = self._get(key)
+        if img is None:
+            factor = self._reduce_factor(path, width, height) if reduced else 1
+            src = self.get_reduced(path, factor)
+            img = src if src.size == (width, height) else src.resize((width, height), Image.Resampling.LANCZOS)
+            self._put(key, img)
+        return img
+
+    @staticmethod
+    def _reduce_factor(path: Path, width: int, height: int) -> int:
+        with Image.open(path) as f:  # header only
+            src_w, src_h = f.size
+        factor = 1
+        while src_w // (factor * 2) >= width and src_h // (factor * 2) >= height:
+            factor *= 2
+        return factor
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._total = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# One per process; export workers each warm their own
+asset_cache = AssetCache()
@@ -0,0 +1,289 @@
+"""
+Campaign batch pipeline: manifest of SKUs -> validated exports.
+
+    python -m app.batch manifest.csv --out campaign_out [--workers 8]
+        [--canvases 1080x1080,1080x1920] [--format jpg] [--max-kb 500] [--remove-bg]
+
+The manifest is a CSV with columns `sku`, `packshot` (path, relative to the
+manifest), `headline` and optionally `subhead`, `value_tile` and `canvases`
+(per-row override, same syntax as --canvases). SKUs must be unique and
+usable as file names.
+
+Each row runs the same stages as the HTTP API, calling the backend modules
+directly: background removal (optional, through the shared cutout cache),
+layout generation from the packshot's aspect ratio, validation, auto-fix,
+and rendering to the export size budget. Rows are streamed through a process
+pool with a bounded in-flight window, so memory stays flat for any manifest
+size. Every finished row appends one JSON line to `<out>/results.jsonl`;
+that log is the checkpoint, and re-running skips SKUs already marked "ok".
+
+Packshots are staged in a per-run directory under UPLOAD_DIR that is removed
+when the run ends. Cutouts are also added to the shared rembg cache, but each
+worker process keeps its own index of it, so REMBG_CACHE_MAX_MB applies per
+process during a run. The next process that opens the cache (API or batch)
+trims the directory back to the bound.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .ai import remove_background_rembg
+from .cache import get_rembg_cache, rembg_cache_key, link_or_copy
+from .compliance import validate_layout, auto_fix_elements
+from .fonts import font_registry
+from .layout_engine import generate_layouts
+from .render import render_export
+from .schemas import ExportRequest, LayoutRequest
+from .utils import UPLOAD_DIR, file_sha256, read_image_meta
+
+RESULTS_FILE = "results.jsonl"
+SUMMARY_FILE = "summary.json"
+DEFAULT_CANVASES = "1080x1080,1080x1920,1200x628"
+# Rows submitted per worker ahead of completion; keeps workers busy without
+# reading the whole manifest into memory
+INFLIGHT_PER_WORKER = 4
+# SKUs become output file names; anything else (slashes, "..") is rejected
+SAFE_SKU = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+def parse_canvases(spec: str) -> List[Tuple[int, int]]:
+    canvases = []
+    for part in spec.split(","):
+        w, _, h = part.strip().lower().partition("x")
+        canvases.append((int(w), int(h)))
+    return canvases
+
+
+def read_manifest(path: Path) -> Iterator[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+            if row.get("sku"):
+                yield row
+
+
+def load_checkpoint(results_path: Path) -> Set[str]:
+    """SKUs that already finished successfully in an earlier run."""
+    done = set()
+    if not results_path.exists():
+        return done
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a killed run
+            if record.get("status") == "ok":
+                done.add(record["sku"])
+    return done
+
+
+def _stage_packshot(source: Path, stage: str) -> str:
+    """
+    Copy the packshot into this run's staging directory under UPLOAD_DIR,
+    where the renderer looks for assets. Returns its name relative to
+    UPLOAD_DIR; content-addressed so repeated packshots are staged once.
+    """
+    digest = file_sha256(source)
+    name = f"{stage}/batch_{digest[:24]}{source.suffix.lower()}"
+    if not (UPLOAD_DIR / name).exists():
+        # A copy, not a link: editing the source later must not change a content-addressed file
+        tmp = UPLOAD_DIR / f"{name}.{os.getpid()}.tmp"
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, UPLOAD_DIR / name)
+    return name
+
+
+def _remove_background(name: str, warnings: List[str]) -> str:
+    # Per-process index over the shared directory; see the module docstring
+    cache = get_rembg_cache()
+    key = rembg_cache_key(file_sha256(UPLOAD_DIR / name))
+    staged = Path(name)
+    out_name = str(staged.with_name(f"nobg_{staged.stem}.png"))
+    cached = cache.get(key)
+    if cached is not None:
+        link_or_copy(cached, UPLOAD_DIR / out_name)
+        return out_name
+    if remove_background_rembg(str(UPLOAD_DIR / name), str(UPLOAD_DIR / out_name)):
+        cache.put_file(key, UPLOAD_DIR / out_name)
+        return out_name
+    warnings.append("Background removal failed, used original packshot")
+    return name
+
+
+def process_item(row: Dict[str, str], options: dict) -> dict:
+    """Run one manifest row end to end. Never raises; failures become the record."""
+    started = time.perf_counter()
+    record = {"sku": row["sku"], "status": "ok", "outputs": [], "warnings": []}
+    try:
+        if not SAFE_SKU.fullmatch(row["sku"]):
+            raise ValueError(f"SKU {row['sku']!r} is not a safe file name (letters, digits, '.', '_', '-')")
+        source = Path(options["base_dir"]) / row["packshot"]
+        name = _stage_packshot(source, options["stage"])
+        if options["remove_bg"]:
+            name = _remove_background(name, record["warnings"])
+        meta = read_image_meta(UPLOAD_DIR / name)
+        if meta is None:
+            raise ValueError(f"Unsupported or corrupt image: {row['packshot']}")
+        aspect = meta[0] / meta[1]
+        canvases = parse_canvases(row["canvases"]) if row.get("canvases") else options["canvases"]
+
+        for w, h in canvases:
+            proposals = generate_layouts(
+                f"/uploads/{name}", w, h, aspect,
+                headline=row.get("headline") or "Big Headline",
+                subhead=row.get("subhead") or None,
+                value_tile=row.get("value_tile") or None,
+                count=1,
+            )
+            if not proposals:
+                raise ValueError(f"No layout fits {w}x{h}")
+            elements = proposals[0].elements
+            layout = LayoutRequest(packshot_id=name, width=w, height=h)
+            report = validate_layout(layout, elements)
+            if not report.overall_pass:
+                elements = auto_fix_elements(elements, w, h)
+                report = validate_layout(layout, elements)
+            if not report.overall_pass:
+                failed = [c for c in report.checks if not c.passed]
+                raise ValueError(f"{w}x{h} not compliant: " + "; ".join(f"{c.check_name}: {c.details}" for c in failed))
+
+            req = ExportRequest(canvas_width=w, canvas_height=h, elements=elements,
+                                format=options["format"], max_kb=options["max_kb"])
+            ext = "png" if options["format"] == "png" else "jpg"
+            result = render_export(req.model_dump(), out_dir=options["export_dir"],
+                                   filename=f"{row['sku']}_{w}x{h}.{ext}")
+            record["outputs"].append({
+                "canvas": f"{w}x{h}",
+                "file": result["filename"],
+                "size_kb": round(result["size_bytes"] / 1024, 1),
+                "quality": result["quality"],
+                "encode_passes": result["encode_passes"],
+                "within_budget": result["size_bytes"] <= result["max_bytes"],
+            })
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = str(e) or e.__class__.__name__
+    record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+
+def _init_worker():
+    font_registry.scan()
+
+
+def run_batch(manifest: Path, out_dir: Path, workers: int, options: dict) -> dict:
+    """Process every SKU not yet done (failed ones are retried); returns run counts."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    export_dir = out_dir / "exports"
+    export_dir.mkdir(exist_ok=True)
+    # Packshots (and cutouts) are staged per run and removed at the end, so
+    # runs don't accumulate files in the live uploads directory
+    stage = f"batch_run_{uuid.uuid4().hex[:12]}"
+    (UPLOAD_DIR / stage).mkdir(parents=True)
+    options = {**options, "base_dir": str(manifest.resolve().parent), "export_dir": str(export_dir), "stage": stage}
+    try:
+        return _run(manifest, out_dir, workers, options)
+    finally:
+        shutil.rmtree(UPLOAD_DIR / stage, ignore_errors=True)
+
+
+def _run(manifest: Path, out_dir: Path, workers: int, options: dict) -> dict:
+
+    results_path = out_dir / RESULTS_FILE
+    done = load_checkpoint(results_path)
+    counts = {"ok": 0, "failed": 0, "skipped": 0}
+    started = time.perf_counter()
+
+    def pending_rows():
+        seen = set()
+        for row in read_manifest(manifest):
+            if row["sku"] in seen:
+                print(f"Duplicate SKU {row['sku']} ignored", file=sys.stderr)
+                continue
+            seen.add(row["sku"])
+            if row["sku"] in done:
+                counts["skipped"] += 1
+                continue
+            yield row
+
+    with open(results_path, "a", encoding="utf-8") as log:
+        def record(result: dict):
+            counts[result["status"]] += 1
+            # One line per item, flushed immediately: this is the checkpoint
+            log.write(json.dumps(result) + "\n")
+            log.flush()
+            n = counts["ok"] + counts["failed"]
+            if n % 100 == 0:
+                rate = n / (time.perf_counter() - started)
+                print(f"{n} done ({counts['failed']} failed), {rate:.1f} items/s", file=sys.stderr)
+
+        if workers <= 0:
+            # In-process, for debugging and small runs
+            _init_worker()
+            for row in pending_rows():
+                record(process_item(row, options))
+        else:
+            rows = pending_rows()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                inflight = set()
+                try:
+                    for row in rows:
+                        inflight.add(pool.submit(process_item, row, options))
+                        if len(inflight) >= workers * INFLIGHT_PER_WORKER:
+                            finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                record(future.result())
+                    for future in wait(inflight).done:
+                        record(future.result())
+                except KeyboardInterrupt:
+                    for future in inflight:
+                        future.cancel()
+                    print("Interrupted; re-run the same command to resume", file=sys.stderr)
+                    raise
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        **counts,
+        "elapsed_s": round(elapsed, 2),
+        "items_per_s": round((counts["ok"] + counts["failed"]) / elapsed, 2) if elapsed else None,
+        "workers": workers,
+        "results": str(results_path),
+    }
+    (out_dir / SUMMARY_FILE).write_text(json.dumps(summary, indent=2))
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.batch", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("manifest", type=Path)
+    parser.add_argument("--out", type=Path, default=Path("batch_out"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="0 runs in-process")
+    parser.add_argument("--canvases", default=DEFAULT_CANVASES)
+    parser.add_argument("--format", choices=["jpg", "png"], default="jpg")
+    parser.add_argument("--max-kb", type=int, default=None)
+    parser.add_argument("--remove-bg", action="store_true")
+    args = parser.parse_args(argv)
+
+    options = {
+        "canvases": parse_canvases(args.canvases),
+        "format": args.format,
+        "max_kb": args.max_kb,
+        "remove_bg": args.remove_bg,
+    }
+    summary = run_batch(args.manifest, args.out, args.workers, options)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
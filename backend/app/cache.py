@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+from .ai import rembg_fingerprint
+from .encode import EXPORT_MAX_KB
+from .render import RENDER_VERSION
+from .schemas import ExportRequest
+from .utils import CACHE_DIR, EXPORT_DIR, UPLOAD_DIR, content_sha256
+
+REMBG_CACHE_DIR = CACHE_DIR / "rembg"
+REMBG_CACHE_MAX_MB = int(os.environ.get("CREATIVEOS_REMBG_CACHE_MB", 512))
+
+# Metadata for deduplicated exports; the images themselves live in EXPORT_DIR
+EXPORT_INDEX_DIR = CACHE_DIR / "exports"
+EXPORT_DIR_MAX_MB = int(os.environ.get("CREATIVEOS_EXPORT_DIR_MB", 2048))
+
+STAMP_FILE = "FINGERPRINT"
+
+
+def make_key(*parts: Union[str, bytes]) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def link_or_copy(src: Path, dst: Path):
+    # Hard links make a cache hit ~free; fall back to a copy across filesystems
+    # Per process and thread: the API and batch workers share these directories
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    try:
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class DiskLRUCache:
+    """
+    Content-addressed file cache with a total-size bound.
+
+    Entries are files named `<key><suffix>` in `directory`. Recency is tracked
+    in memory (seeded from file mtimes at startup) and least-recently-used
+    entries are deleted once the directory grows past `max_bytes`.
+
+    `fingerprint` identifies whatever produced the cached files (model name,
+    settings). If it differs from the one stored on disk the cache is wiped,
+    so a model upgrade never serves stale results.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, fingerprint: str, suffix: str = ""):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._load()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def _load(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = self.directory / STAMP_FILE
+        if not stamp.exists() or stamp.read_text() != self.fingerprint:
+            self._clear_files()
+            stamp.write_text(self.fingerprint)
+            return
+        files = [p for p in self.directory.iterdir()
+                 if p.is_file() and p.name != STAMP_FILE and p.name.endswith(self.suffix)]
+        for p in sorted(files, key=lambda p: p.stat().st_mtime):
+            size = p.stat().st_size
+            self._entries[p.name[:len(p.name) - len(self.suffix)]] = size
+            self._total += size
+        self._evict()
+
+    def _clear_files(self):
+        for p in self.directory.iterdir():
+            if p.is_file() and p.name != STAMP_FILE:
+                p.unlink()
+        self._entries.clear()
+        self._total = 0
+
+    def _evict(self):
+        while self._total > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> Optional[Path]:
+        with self._lock:
+            path = self._path(key)
+            if key in self._entries and path.exists():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return path
+            if key in self._entries:
+                # Deleted behind our back
+                self._total -= self._entries.pop(key)
+            self.misses += 1
+            return None
+
+    def put_file(self, key: str, src: Path) -> Path:
+        """Store a copy of `src` under `key` and return the cached path."""
+        with self._lock:
+            path = self._path(key)
+            link_or_copy(Path(src), path)
+            size = path.stat().st_size
+            self._total += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+            return path
+
+    def discard(self, key: str):
+        """Drop one entry, if present."""
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+            self._path(key).unlink(missing_ok=True)
+
+    def invalidate(self, fingerprint: Optional[str] = None):
+        """Drop every entry. Pass a new fingerprint when the producer changed."""
+        with self._lock:
+            if fingerprint is not None:
+                self.fingerprint = fingerprint
+            self._clear_files()
+            (self.directory / STAMP_FILE).write_text(self.fingerprint)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "fingerprint": self.fingerprint,
+        }
+
+
+_rembg_cache: Optional[DiskLRUCache] = None
+
+
+def get_rembg_cache() -> DiskLRUCache:
+    global _rembg_cache
+    if _rembg_cache is None:
+        _rembg_cache = DiskLRUCache(
+            REMBG_CACHE_DIR,
+            max_bytes=REMBG_CACHE_MAX_MB * 1024 * 1024,
+            fingerprint=rembg_fingerprint(),
+            suffix=".png",
+        )
+    return _rembg_cache
+
+
+def rembg_cache_key(source_sha256: str) -> str:
+    return make_key(source_sha256, rembg_fingerprint())
+
+
+def export_render_key(req: ExportRequest) -> str:
+    """
+    Key for everything that determines an export's bytes: the canonical
+    request (defaults filled in, keys sorted), the content of every upload it
+    references and the renderer version. Identical keys render identically.
+    """
+    data = req.model_dump(mode="json")
+    data["max_kb"] = data.get("max_kb") or EXPORT_MAX_KB
+    assets = []
+    for el in req.elements:
+        if el.text and "/uploads/" in el.text:
+            path = UPLOAD_DIR / el.text.split("/uploads/")[-1]
+            try:
+                assets.append(content_sha256(path))
+            except OSError:
+                assets.append("missing")
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return make_key(RENDER_VERSION, canonical, *assets)
+
+
+def export_filename(key: str, req: ExportRequest) -> str:
+    ext = "png" if req.format == "png" else "jpg"
+    return f"export_{req.canvas_width}x{req.canvas_height}_{key[:24]}.{ext}"
+
+
+class ExportCache:
+    """
+    Deduplicating index over EXPORT_DIR, plus a size bound on that directory.
+
+    A finished export's result dict is stored as `<index_dir>/<key>.json`
+    next to its (key-derived) file in `export_dir`, so a repeat request is a
+    metadata read. Every file in `export_dir` counts toward `max_bytes`,
+    including exports from before the cache existed; least recently
+    produced/served files are deleted first.
+    """
+
+    def __init__(self, export_dir: Path, index_dir: Path, max_bytes: int):
+        self.export_dir = Path(export_dir)
+        self.index_dir = Path(index_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._load()
+
+    def _load(self):
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        files = [p for p in self.export_dir.iterdir() if p.is_file() and not p.name.startswith(".")]
+        for p in sorted(files, key=lambda p: p.stat().st_mtime):
+            self._files[p.name] = p.stat().st_size
+            self._total += self._files[p.name]
+        self._evict()
+
+    def _index_path(self, key: str) -> Path:
+        return self.index_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """Stored result for `key` if its file is still on disk."""
+        try:
+            result = json.loads(self._index_path(key).read_text())
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        path = self.export_dir / result["filename"]
+        with self._lock:
+            if not path.exists():
+                self._forget(result["filename"])
+                self._index_path(key).unlink(missing_ok=True)
+                self.misses += 1
+                return None
+            if result["filename"] in self._files:
+                self._files.move_to_end(result["filename"])
+            self.hits += 1
+        # mtime carries recency across restarts
+        os.utime(path)
+        return result
+
+    def put(self, key: str, result: dict):
+        """Record a freshly written export and enforce the size bound."""
+        entry = {k: v for k, v in result.items() if k not in ("pid", "asset_cache", "timings", "started_at")}
+        entry["key"] = key
+        tmp = self._index_path(key).with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry))
+        os.replace(tmp, self._index_path(key))
+        with self._lock:
+            self._forget(result["filename"])
+            self._files[result["filename"]] = result["size_bytes"]
+            self._total += result["size_bytes"]
+            self._evict()
+
+    def discard(self, key: str):
+        """Delete the export stored under `key` along with its index entry."""
+        try:
+            result = json.loads(self._index_path(key).read_text())
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._forget(result["filename"])
+            (self.export_dir / result["filename"]).unlink(missing_ok=True)
+            self._index_path(key).unlink(missing_ok=True)
+
+    def _forget(self, name: str):
+        self._total -= self._files.pop(name, 0)
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            (self.export_dir / name).unlink(missing_ok=True)
+            # The index entry is dropped lazily by get() once its file is gone
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "files": len(self._files),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_export_cache: Optional[ExportCache] = None
+
+
+def get_export_cache() -> ExportCache:
+    global _export_cache
+    if _export_cache is None:
+        _export_cache = ExportCache(EXPORT_DIR, EXPORT_INDEX_DIR, max_bytes=EXPORT_DIR_MAX_MB * 1024 * 1024)
+    return _export_cache
@@ -1,88 +1,178 @@
 from .schemas import ValidationReport, ComplianceCheck, LayoutElement, LayoutRequest
-from typing import List
+from .geometry import Box, SpatialIndex, element_bbox, element_height
+from .copy_rules import CopyRuleLoader, CopyRuleSet, COPY_RULES_PATH
+from typing import List, Optional
+import copy
 
-def check_file_size(max_kb: int = 500) -> ComplianceCheck:
-    # Logic to check exported file size - simplified for validation report 
-    # as we don't have the file yet in validation phase usually, but this might be run post-export or pre-export check?
-    # The prompt says "return a structured report... file_size ... after export". 
-    # But /validate is likely called BEFORE export on the Layout JSON.
-    # So we can't check file size yet. We'll return "pass" with note "Checked on export".
-    return ComplianceCheck(check_name="file_size", passed=True, details="Will be validated during export (limit 500KB).")
+# Rule constants shared by the per-layout and batch validators
+MIN_WIDTH = 600
+SAFE_ZONE_TOP = 200 # 9:16 only
+SAFE_ZONE_BOTTOM = 250
+MAX_PACKSHOTS = 3
+
+def check_file_size(size_bytes: Optional[int] = None, max_kb: int = 500, passes: Optional[int] = None) -> ComplianceCheck:
+    # /validate runs on layout JSON before anything is encoded, so without a
+    # size we can only defer. The export encoder passes the real byte count.
+    if size_bytes is None:
+        return ComplianceCheck(check_name="file_size", passed=True, details=f"Will be validated during export (limit {max_kb}KB).")
+
+    size_kb = size_bytes / 1024
+    details = f"Export size {size_kb:.1f}KB (limit {max_kb}KB"
+    if passes is not None:
+        details += f", {passes} encode pass{'es' if passes != 1 else ''}"
+    details += ")"
+    if size_kb > max_kb:
+        return ComplianceCheck(check_name="file_size", passed=False, details=details,
+                               suggested_fix="Reduce photographic detail or export as JPG.")
+    return ComplianceCheck(check_name="file_size", passed=True, details=details)
 
 def check_dimensions(width: int, height: int) -> ComplianceCheck:
     passed = True
     details = f"Dimensions: {width}x{height}"
-    if width < 600:
+    if width < MIN_WIDTH:
         passed = False # Warning as per prompt? "warn if width < 600"
         details += ". Warning: Width < 600px."
     return ComplianceCheck(check_name="dimensions", passed=passed, details=details)
 
+def is_9_16_canvas(width: int, height: int) -> bool:
+    return width == 1080 and height == 1920
+
+def safe_zone_messages(label: str, el_y: float, el_bottom: float, max_y: float) -> List[str]:
+    messages = []
+    if el_y < SAFE_ZONE_TOP:
+        messages.append(f"'{label}' too high (Y:{int(el_y)} < {SAFE_ZONE_TOP})")
+    if el_bottom > max_y:
+        messages.append(f"'{label}' too low (Bottom:{int(el_bottom)} > {int(max_y)})")
+    return messages
+
+def safe_zones_result(violations: List[str]) -> ComplianceCheck:
+    if violations:
+        return ComplianceCheck(check_name="safe_zones", passed=False,
+                               details="9:16 Safe Zone Violation: " + "; ".join(violations),
+                               suggested_fix="Move elements out of red zones.")
+    return ComplianceCheck(check_name="safe_zones", passed=True, details="Safe zones respected.")
+
 def check_safe_zones(elements: List[LayoutElement], canvas_width: int, canvas_height: int) -> ComplianceCheck:
     """
     Enforce safe zones. 
     9:16 (1080x1920): Top 200px and Bottom 250px must be free.
     """
-    passed = True
-    details = "Safe zones respected."
-    is_9_16 = (canvas_width == 1080 and canvas_height == 1920)
-    
-    if is_9_16:
-        top_zone = 200
-        bottom_zone = 250
-        max_y = canvas_height - bottom_zone
-        
-        violations = []
+    violations = []
+    if is_9_16_canvas(canvas_width, canvas_height):
+        max_y = canvas_height - SAFE_ZONE_BOTTOM
         for el in elements:
-            # Simple bounding box check
-            el_y = el.y
-            el_h = el.height if el.height else (el.font_size if el.font_size else 0) 
-            # Text height approximation is tricky without rendering, assume simple box
-            el_bottom = el_y + el_h
-            
-            if el_y < top_zone:
-                violations.append(f"'{el.text or el.type}' too high (Y:{int(el_y)} < {top_zone})")
-            if el_bottom > max_y:
-                violations.append(f"'{el.text or el.type}' too low (Bottom:{int(el_bottom)} > {max_y})")
-        
-        if violations:
-            passed = False
-            details = "9:16 Safe Zone Violation: " + "; ".join(violations)
+            # Text height comes from font metrics, wrapped to the element width
+            el_h = element_height(el)
+            violations.extend(safe_zone_messages(el.text or el.type, el.y, el.y + el_h, max_y))
 
-    return ComplianceCheck(check_name="safe_zones", passed=passed, details=details, suggested_fix="Move elements out of red zones." if not passed else None)
+    return safe_zones_result(violations)
 
 FORBIDDEN_PHRASES = [
     "price match", "money back", "competition", "win", "sustainable", "charity", "discount", "% off"
 ]
 
+_copy_rules = CopyRuleLoader(COPY_RULES_PATH, FORBIDDEN_PHRASES)
+
+def get_copy_rules() -> CopyRuleSet:
+    # Compiled once; recompiled only when the rules file changes
+    return _copy_rules.get()
+
+def copy_result(found: List[str]) -> ComplianceCheck:
+    if found:
+        return ComplianceCheck(check_name="forbidden_copy", passed=False, details="; ".join(found), suggested_fix="Remove forbidden claims.")
+    return ComplianceCheck(check_name="forbidden_copy", passed=True, details="No forbidden copy found.")
+
 def check_copy(elements: List[LayoutElement]) -> ComplianceCheck:
-    passed = True
+    rules = get_copy_rules()
     found = []
     for el in elements:
         if el.type == "text" and el.text:
-            lower_text = el.text.lower()
-            for bad in FORBIDDEN_PHRASES:
-                if bad in lower_text:
-                    found.append(f"Forbidden: '{bad}' in '{el.text}'")
-    
-    if found:
-        passed = False
-        return ComplianceCheck(check_name="forbidden_copy", passed=False, details="; ".join(found), suggested_fix="Remove forbidden claims.")
-    
-    return ComplianceCheck(check_name="forbidden_copy", passed=True, details="No forbidden copy found.")
+            # One scan per text for all phrases
+            for bad in rules.find(el.text):
+                found.append(f"Forbidden: '{bad}' in '{el.text}'")
+    return copy_result(found)
+
+def packshot_count_result(count: int) -> ComplianceCheck:
+    if count > MAX_PACKSHOTS:
+        return ComplianceCheck(check_name="packshot_rules", passed=False, details=f"Too many packshots: {count} > {MAX_PACKSHOTS}")
+    return ComplianceCheck(check_name="packshot_rules", passed=True, details=f"Packshot count: {count}")
+
+def check_packshot_count(elements: List[LayoutElement]) -> ComplianceCheck:
+    return packshot_count_result(sum(1 for e in elements if e.type == 'packshot'))
+
+# Tolerance so elements flush with an edge or touching each other don't trip rules
+GEOMETRY_TOLERANCE = 1.0
+IMAGE_TYPES = ("packshot", "image", "logo")
+
+def _label(el: LayoutElement) -> str:
+    return el.text or el.type
+
+def is_value_tile(el: LayoutElement) -> bool:
+    return el.type == "text" and el.tile_type is not None
+
+def canvas_bounds_message(el: LayoutElement, box: Box, canvas_width: int, canvas_height: int) -> Optional[str]:
+    x0, y0, x1, y1 = box
+    t = GEOMETRY_TOLERANCE
+    if x0 < -t or y0 < -t or x1 > canvas_width + t or y1 > canvas_height + t:
+        return f"'{_label(el)}' outside canvas ({int(x0)},{int(y0)})-({int(x1)},{int(y1)})"
+    return None
+
+def canvas_bounds_result(messages: List[str]) -> ComplianceCheck:
+    if messages:
+        return ComplianceCheck(check_name="canvas_bounds", passed=False, details="; ".join(messages),
+                               suggested_fix="Move or shrink elements to fit inside the canvas.")
+    return ComplianceCheck(check_name="canvas_bounds", passed=True, details="All elements inside canvas.")
+
+def check_canvas_bounds(elements: List[LayoutElement], canvas_width: int, canvas_height: int, boxes: Optional[List[Box]] = None) -> ComplianceCheck:
+    boxes = boxes if boxes is not None else [element_bbox(el) for el in elements]
+    messages = []
+    for el, box in zip(elements, boxes):
+        msg = canvas_bounds_message(el, box, canvas_width, canvas_height)
+        if msg:
+            messages.append(msg)
+    return canvas_bounds_result(messages)
+
+def overlap_message(a: LayoutElement, b: LayoutElement, box_a: Box, box_b: Box) -> Optional[str]:
+    """Describe a forbidden overlap between a and b, or None if it's allowed."""
+    # Ignore hairline contacts
+    t = GEOMETRY_TOLERANCE
+    if min(box_a[2], box_b[2]) - max(box_a[0], box_b[0]) <= t or min(box_a[3], box_b[3]) - max(box_a[1], box_b[1]) <= t:
+        return None
+    for x, y in ((a, b), (b, a)):
+        if x.type == "text" and not is_value_tile(x) and y.type in IMAGE_TYPES:
+            return f"Text '{_label(x)}' overlaps {y.type}"
+        if is_value_tile(x) and y.type == "text" and not is_value_tile(y):
+            return f"Value tile '{x.tile_type}' collides with '{_label(y)}'"
+    return None
+
+def overlap_result(messages: List[str]) -> ComplianceCheck:
+    if messages:
+        return ComplianceCheck(check_name="element_overlap", passed=False, details="; ".join(messages),
+                               suggested_fix="Separate text from packshots and value tiles.")
+    return ComplianceCheck(check_name="element_overlap", passed=True, details="No overlapping elements.")
+
+def check_overlaps(elements: List[LayoutElement], index: Optional[SpatialIndex] = None) -> ComplianceCheck:
+    """Pairwise rules, evaluated only on candidate pairs from the spatial index."""
+    index = index if index is not None else SpatialIndex([element_bbox(el) for el in elements])
+    messages = []
+    for i, j in index.overlapping_pairs():
+        msg = overlap_message(elements[i], elements[j], index.boxes[i], index.boxes[j])
+        if msg:
+            messages.append(msg)
+    return overlap_result(messages)
 
 def validate_layout(layout: LayoutRequest, elements: List[LayoutElement]) -> ValidationReport:
+    # Elements may be LayoutElement models or records.ElementRecord; rules only read attributes
     checks = []
     checks.append(check_dimensions(layout.width, layout.height))
     checks.append(check_safe_zones(elements, layout.width, layout.height))
     checks.append(check_copy(elements))
-    
-    # Additional checks (Packshot count, Value Tile) omitted for brevity in this step but would go here.
-    # Implementing Packshot count
-    packshots = [e for e in elements if e.type == 'packshot']
-    if len(packshots) > 3:
-         checks.append(ComplianceCheck(check_name="packshot_rules", passed=False, details=f"Too many packshots: {len(packshots)} > 3"))
-    else:
-         checks.append(ComplianceCheck(check_name="packshot_rules", passed=True, details=f"Packshot count: {len(packshots)}"))
+    checks.append(check_packshot_count(elements))
+
+    # Geometry rules share one set of boxes and one spatial index
+    index = SpatialIndex([element_bbox(el) for el in elements])
+    checks.append(check_canvas_bounds(elements, layout.width, layout.height, index.boxes))
+    checks.append(check_overlaps(elements, index))
 
     # Determine overall pass
     overall = all(c.passed for c in checks)
@@ -92,28 +182,28 @@ def auto_fix_elements(elements: List[LayoutElement], width: int, height: int) ->
     fixed_elements = []
     
     # Safe Zones for 9:16
-    is_9_16 = (width == 1080 and height == 1920)
-    top_zone = 200
-    bottom_zone = 250
+    is_9_16 = is_9_16_canvas(width, height)
+    top_zone = SAFE_ZONE_TOP
+    bottom_zone = SAFE_ZONE_BOTTOM
     max_y = height - bottom_zone
     
     for el in elements:
-        new_el = el.copy() # Pydantic copy
+        new_el = copy.copy(el) # Shallow copy; works for models and ElementRecords
         
-        # 1. Fix Safe Zones (9:16 Only for now as per rules)
+        # 1. Fix Font Size (Min 24) first, since it changes the measured height
+        if new_el.type == 'text' and new_el.font_size and new_el.font_size < 24:
+            new_el.font_size = 24
+
+        # 2. Fix Safe Zones (9:16 Only for now as per rules)
         if is_9_16:
             # Top violation
             if new_el.y < top_zone:
                 new_el.y = top_zone + 10 # Start 10px below danger
             
             # Bottom violation
-            el_h = new_el.height if new_el.height else (new_el.font_size if new_el.font_size else 50)
+            el_h = element_height(new_el, default=50)
             if new_el.y + el_h > max_y:
                 new_el.y = max_y - el_h - 10 # End 10px above danger
-                
-        # 2. Fix Font Size (Min 24)
-        if new_el.type == 'text' and new_el.font_size and new_el.font_size < 24:
-            new_el.font_size = 24
             
         fixed_elements.append(new_el)
         
@@ -0,0 +1,118 @@
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+from .compliance import (check_dimensions, copy_result, get_copy_rules, safe_zone_messages,
+                         safe_zones_result, packshot_count_result, canvas_bounds_message,
+                         canvas_bounds_result, check_overlaps, overlap_result,
+                         SAFE_ZONE_TOP, SAFE_ZONE_BOTTOM, GEOMETRY_TOLERANCE)
+from .geometry import SpatialIndex, element_bbox, element_height
+from .schemas import ValidationReport, ValidationRequest
+
+# Layouts validated per vectorized pass. Bounds the columnar NumPy arrays; the
+# parsed layouts themselves are all in memory (bad input must 422 before streaming)
+BATCH_CHUNK_SIZE = 2000
+
+
+def validate_layouts_batch(layouts: List[ValidationRequest]) -> List[ValidationReport]:
+    """
+    Validate many layouts at once. Produces the same reports as
+    compliance.validate_layout, but the geometry rules (dimensions, 9:16
+    safe zones, canvas bounds, packshot count) run as NumPy passes over
+    every element of every layout, and all copy is scanned in one regex
+    pass. Overlap rules use one spatial index per layout. Per-element
+    Python work is limited to gathering columns and formatting messages for
+    elements that actually violate something.
+    """
+    n = len(layouts)
+    if n == 0:
+        return []
+
+    widths = np.fromiter((l.width for l in layouts), dtype=np.int64, count=n)
+    heights = np.fromiter((l.height for l in layouts), dtype=np.int64, count=n)
+    counts = np.fromiter((len(l.elements) for l in layouts), dtype=np.int64, count=n)
+    total = int(counts.sum())
+
+    # Columnar element geometry, one row per element across all layouts
+    owner = np.repeat(np.arange(n), counts)
+    ys = np.empty(total, dtype=np.float64)
+    hs = np.empty(total, dtype=np.float64)
+    boxes = np.empty((total, 4), dtype=np.float64)
+    packshot = np.zeros(total, dtype=bool)
+    texts, text_owner = [], []
+    i = 0
+    for k, layout in enumerate(layouts):
+        for el in layout.elements:
+            boxes[i] = element_bbox(el)
+            ys[i] = el.y
+            hs[i] = element_height(el)
+            packshot[i] = el.type == "packshot"
+            if el.type == "text" and el.text:
+                texts.append(el.text)
+                text_owner.append(k)
+            i += 1
+
+    # Safe zones: only 9:16 canvases have them
+    is_9_16 = (widths == 1080) & (heights == 1920)
+    el_9_16 = is_9_16[owner]
+    max_y = (heights - SAFE_ZONE_BOTTOM)[owner]
+    too_high = el_9_16 & (ys < SAFE_ZONE_TOP)
+    too_low = el_9_16 & (ys + hs > max_y)
+    violating = np.flatnonzero(too_high | too_low)
+
+    packshot_counts = np.bincount(owner[packshot], minlength=n)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    violations: List[List[str]] = [[] for _ in range(n)]
+    for idx in violating:
+        layout_i = owner[idx]
+        el = layouts[layout_i].elements[idx - starts[layout_i]]
+        violations[layout_i].extend(
+            safe_zone_messages(el.text or el.type, ys[idx], ys[idx] + hs[idx], max_y[idx])
+        )
+
+    # Canvas bounds over the box columns
+    t = GEOMETRY_TOLERANCE
+    outside = ((boxes[:, 0] < -t) | (boxes[:, 1] < -t)
+               | (boxes[:, 2] > widths[owner] + t) | (boxes[:, 3] > heights[owner] + t))
+    bounds: List[List[str]] = [[] for _ in range(n)]
+    for idx in np.flatnonzero(outside):
+        layout_i = owner[idx]
+        el = layouts[layout_i].elements[idx - starts[layout_i]]
+        bounds[layout_i].append(canvas_bounds_message(el, tuple(boxes[idx]), widths[layout_i], heights[layout_i]))
+
+    # Copy rules: one regex scan over every text in the chunk
+    copy_found: List[List[str]] = [[] for _ in range(n)]
+    for text, k, phrases in zip(texts, text_owner, get_copy_rules().find_many(texts)):
+        copy_found[k].extend(f"Forbidden: '{bad}' in '{text}'" for bad in phrases)
+
+    reports = []
+    for k, layout in enumerate(layouts):
+        checks = [
+            check_dimensions(int(widths[k]), int(heights[k])),
+            safe_zones_result(violations[k]),
+            copy_result(copy_found[k]),
+            packshot_count_result(int(packshot_counts[k])),
+            canvas_bounds_result(bounds[k]),
+        ]
+        # Pairwise rules need a per-layout index; skip layouts that can't overlap
+        start, count = int(starts[k]), int(counts[k])
+        if count > 1:
+            index = SpatialIndex([tuple(b) for b in boxes[start:start + count].tolist()])
+            checks.append(check_overlaps(layout.elements, index))
+        else:
+            checks.append(overlap_result([]))
+        reports.append(ValidationReport(overall_pass=all(c.passed for c in checks), checks=checks))
+    return reports
+
+
+def iter_validate_layouts(layouts: Iterable[ValidationRequest], chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[ValidationReport]:
+    """Stream reports, validating `chunk_size` layouts per vectorized pass."""
+    chunk: List[ValidationRequest] = []
+    for layout in layouts:
+        chunk.append(layout)
+        if len(chunk) >= chunk_size:
+            yield from validate_layouts_batch(chunk)
+            chunk = []
+    if chunk:
+        yield from validate_layouts_batch(chunk)
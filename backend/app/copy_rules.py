@@ -0,0 +1,150 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .utils import BASE_DIR
+
+# JSON file: {"version": "2024-06-01", "phrases": ["price match", ...]}
+COPY_RULES_PATH = Path(os.environ.get("CREATIVEOS_COPY_RULES", BASE_DIR / "rules" / "forbidden_copy.json"))
+
+
+def normalize(text: str) -> str:
+    """Casefold + NFKC so 'ＷＩＮ', 'Win' and 'win' all compare equal."""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _collapse(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _trie_regex(node: Dict) -> str:
+    """
+    Turn a character trie into a regex where shared prefixes are factored
+    out ('win', 'winner' -> 'win(?:ner)?'), so the engine walks each text
+    position once down the trie instead of trying every phrase in turn.
+    """
+    end = "" in node
+    branches = []
+    for ch in sorted(k for k in node if k != ""):
+        atom = r"\s+" if ch == " " else re.escape(ch)
+        branches.append(atom + _trie_regex(node[ch]))
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if end:
+        body = "(?:" + body + ")?"
+    return body
+
+
+class CopyRuleSet:
+    """
+    A versioned list of forbidden phrases compiled into a single regex.
+
+    Matching is case/Unicode-insensitive and respects word boundaries: a
+    phrase that starts (ends) with a word character must not be preceded
+    (followed) by one, so 'win' does not match 'wine' or 'window' while
+    '% off' still matches '50% off'.
+    """
+
+    def __init__(self, phrases: List[str], version: str = "builtin"):
+        self.version = version
+        self.phrases: Dict[str, str] = {}
+        for phrase in phrases:
+            key = _collapse(normalize(phrase))
+            if key:
+                self.phrases.setdefault(key, phrase)
+        # Identifies the phrase list itself, whatever `version` says
+        self.digest = hashlib.sha256("\0".join(sorted(self.phrases)).encode("utf-8")).hexdigest()[:16]
+        self._pattern = self._compile()
+
+    def _compile(self) -> Optional["re.Pattern"]:
+        if not self.phrases:
+            return None
+        # Boundaries depend on the phrase's first/last character, so group
+        # phrases by which guards they need and build one trie per group
+        groups: Dict[tuple, Dict] = {}
+        for key in self.phrases:
+            guards = (key[0].isalnum() or key[0] == "_", key[-1].isalnum() or key[-1] == "_")
+            trie = groups.setdefault(guards, {})
+            node = trie
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        alternatives = []
+        for (left, right), trie in groups.items():
+            alternatives.append(("(?<!\\w)" if left else "") + "(?:" + _trie_regex(trie) + ")" + ("(?!\\w)" if right else ""))
+        return re.compile("|".join(alternatives))
+
+    def find(self, text: str) -> List[str]:
+        """Forbidden phrases (as configured) found in `text`, in order of appearance."""
+        if not text or self._pattern is None:
+            return []
+        found = []
+        for m in self._pattern.finditer(normalize(text)):
+            phrase = self.phrases.get(_collapse(m.group(0)))
+            if phrase is not None and phrase not in found:
+                found.append(phrase)
+        return found
+
+    def find_many(self, texts: List[str]) -> List[List[str]]:
+        """
+        `find` for many texts in a single regex scan: normalized texts are
+        joined with NUL (a non-word, non-space separator, so neither word
+        guards nor `\\s+` can match across it) and matches are mapped back to
+        their text by offset.
+        """
+        results: List[List[str]] = [[] for _ in texts]
+        if not texts or self._pattern is None:
+            return results
+        normalized = [normalize(t) for t in texts]
+        offsets = []
+        pos = 0
+        for t in normalized:
+            offsets.append(pos)
+            pos += len(t) + 1
+        joined = "\0".join(normalized)
+        for m in self._pattern.finditer(joined):
+            i = bisect.bisect_right(offsets, m.start()) - 1
+            phrase = self.phrases.get(_collapse(m.group(0)))
+            if phrase is not None and phrase not in results[i]:
+                results[i].append(phrase)
+        return results
+
+
+class CopyRuleLoader:
+    """Loads the rule file, recompiling only when its mtime changes."""
+
+    def __init__(self, path: Path, default_phrases: List[str]):
+        self.path = Path(path)
+        self.default_phrases = default_phrases
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._rules: Optional[CopyRuleSet] = None
+
+    def get(self) -> CopyRuleSet:
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            if self._rules is None or mtime != self._mtime:
+                self._rules = self._load(mtime)
+                self._mtime = mtime
+            return self._rules
+
+    def _load(self, mtime) -> CopyRuleSet:
+        if mtime is None:
+            return CopyRuleSet(self.default_phrases, version="builtin")
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            return CopyRuleSet(data["phrases"], version=str(data.get("version", mtime)))
+        except Exception as e:
+            print(f"Could not load copy rules from {self.path}: {e}")
+            # Keep the last good rules rather than silently allowing everything
+            return self._rules or CopyRuleSet(self.default_phrases, version="builtin")
@@ -0,0 +1,162 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import ImageFont
+
+from .utils import BASE_DIR
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+# Project fonts first so brand fonts win over system fonts with the same name
+DEFAULT_FONT_DIRS = [
+    BASE_DIR / "fonts",
+    Path("/usr/share/fonts"),
+    Path("/usr/local/share/fonts"),
+    Path.home() / ".fonts",
+    Path.home() / ".local" / "share" / "fonts",
+    Path("/Library/Fonts"),
+    Path("/System/Library/Fonts"),
+    Path(os.environ.get("WINDIR", "C:\\Windows")) / "Fonts",
+]
+
+# Metric-compatible / look-alike substitutes for families the frontend
+# offers but that are rarely installed on Linux servers.
+FAMILY_FALLBACKS = {
+    "arial": ["liberation sans", "arimo", "helvetica", "dejavu sans"],
+    "helvetica": ["liberation sans", "arimo", "arial", "dejavu sans"],
+    "times new roman": ["liberation serif", "tinos", "dejavu serif"],
+    "courier new": ["liberation mono", "cousine", "dejavu sans mono"],
+    "sans-serif": ["arial", "liberation sans", "dejavu sans"],
+    "serif": ["times new roman", "liberation serif", "dejavu serif"],
+    "monospace": ["courier new", "liberation mono", "dejavu sans mono"],
+}
+DEFAULT_FAMILY = os.environ.get("CREATIVEOS_DEFAULT_FONT", "sans-serif")
+
+# Styles that count as the upright regular face of a family
+REGULAR_STYLES = ("regular", "book", "roman", "normal", "medium")
+
+FONT_CACHE_SIZE = int(os.environ.get("CREATIVEOS_FONT_CACHE_SIZE", 256))
+
+
+def _configured_dirs() -> List[Path]:
+    extra = os.environ.get("CREATIVEOS_FONT_DIRS")
+    dirs = [Path(p) for p in extra.split(os.pathsep) if p] if extra else []
+    return dirs + DEFAULT_FONT_DIRS
+
+
+def _norm(name: str) -> str:
+    return " ".join(name.replace("_", " ").replace("-", " ").lower().split())
+
+
+class FontRegistry:
+    """
+    Maps font family names to files and caches loaded FreeType faces.
+
+    Font directories are scanned once (on first use or via `scan()` at
+    startup). Faces are kept in an LRU keyed by (family, size) since every
+    size is a separate FreeType face.
+    """
+
+    def __init__(self, dirs: Optional[List[Path]] = None, cache_size: int = FONT_CACHE_SIZE):
+        self.dirs = dirs
+        self.cache_size = cache_size
+        self._families: Optional[Dict[str, Dict[str, str]]] = None
+        self._faces: "OrderedDict[tuple, ImageFont.ImageFont]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def scan(self) -> Dict[str, Dict[str, str]]:
+        families: Dict[str, Dict[str, str]] = {}
+        stems: Dict[str, str] = {}
+        for d in (self.dirs if self.dirs is not None else _configured_dirs()):
+            if not d.is_dir():
+                continue
+            for root, _, files in os.walk(d):
+                for name in sorted(files):
+                    if not name.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        family, style = ImageFont.truetype(path, size=12).getname()
+                    except Exception:
+                        continue
+                    styles = families.setdefault(_norm(family or ""), {})
+                    styles.setdefault(_norm(style or "regular"), path)
+                    # "arial" -> arial.ttf style lookups by file name
+                    stems.setdefault(_norm(os.path.splitext(name)[0]), path)
+        for stem, path in stems.items():
+            families.setdefault(stem, {"regular": path})
+        with self._lock:
+            self._families = families
+            self._faces.clear()
+        return families
+
+    @property
+    def families(self) -> Dict[str, Dict[str, str]]:
+        if self._families is None:
+            self.scan()
+        return self._families
+
+    def _pick(self, styles: Dict[str, str]) -> str:
+        for style in REGULAR_STYLES:
+            if style in styles:
+                return styles[style]
+        return next(iter(styles.values()))
+
+    def resolve(self, family: Optional[str]) -> Optional[str]:
+        """File path for `family`, following fallbacks; None if nothing matches."""
+        seen = set()
+        queue = [_norm(family or DEFAULT_FAMILY), _norm(DEFAULT_FAMILY)]
+        while queue:
+            name = queue.pop(0)
+            if name in seen:
+                continue
+            seen.add(name)
+            if name in self.families:
+                return self._pick(self.families[name])
+            queue[0:0] = FAMILY_FALLBACKS.get(name, [])
+        # Anything beats the bitmap default font
+        if self.families:
+            return self._pick(next(iter(self.families.values())))
+        return None
+
+    def get_font(self, family: Optional[str], size: int):
+        size = max(1, int(size))
+        key = (_norm(family or DEFAULT_FAMILY), size)
+        with self._lock:
+            font = self._faces.get(key)
+            if font is not None:
+                self._faces.move_to_end(key)
+                self.hits += 1
+                return font
+        self.misses += 1
+        path = self.resolve(family)
+        try:
+            font = ImageFont.truetype(path, size=size) if path else ImageFont.load_default(size=size)
+        except Exception as e:
+            print(f"Font load failed for '{family}' ({path}): {e}")
+            font = ImageFont.load_default(size=size)
+        with self._lock:
+            self._faces[key] = font
+            while len(self._faces) > self.cache_size:
+                self._faces.popitem(last=False)
+        return font
+
+    def stats(self) -> dict:
+        return {
+            "families": len(self.families),
+            "cached_faces": len(self._faces),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+font_registry = FontRegistry()
+
+
+def get_font(family: Optional[str], size: int):
+    return font_registry.get_font(family, size)
@@ -0,0 +1,76 @@
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .schemas import LayoutElement
+from .textmetrics import TextLayout, measure_text
+
+Box = Tuple[float, float, float, float] # x0, y0, x1, y1
+
+
+def text_layout(el: LayoutElement) -> Optional[TextLayout]:
+    """Measured lines of a text element, wrapped to its width if it has one."""
+    if el.type != "text" or not el.text:
+        return None
+    return measure_text(el.text, el.font_family, el.font_size, el.width or None)
+
+
+def element_bbox(el: LayoutElement) -> Box:
+    """Axis-aligned box an element occupies. Text is measured from font metrics."""
+    w, h = el.width or 0, el.height or 0
+    layout = text_layout(el)
+    if layout is not None:
+        # An explicit box that the text overflows is grown to the ink extent
+        w, h = max(w, layout.width), max(h, layout.height)
+    return (el.x, el.y, el.x + w, el.y + h)
+
+
+def element_height(el: LayoutElement, default: float = 0) -> float:
+    """Vertical extent checked against safe zones."""
+    if el.type == "text" and el.text:
+        _, y0, _, y1 = element_bbox(el)
+        return y1 - y0
+    return el.height or el.font_size or default
+
+
+class SpatialIndex:
+    """
+    Sweep-line index over element bounding boxes.
+
+    Boxes are sorted by left edge once; `overlapping_pairs()` then sweeps
+    left to right keeping only boxes whose x-range is still open, so the
+    work is O(n log n + k) for k candidate pairs instead of testing all
+    n^2 pairs. Build one per validation and share it between rules.
+    """
+
+    def __init__(self, boxes: Sequence[Box]):
+        self.boxes = list(boxes)
+        self._order = sorted(range(len(self.boxes)), key=lambda i: self.boxes[i][0])
+        self._pairs = None
+
+    def overlapping_pairs(self) -> List[Tuple[int, int]]:
+        """Index pairs (i < j) whose boxes overlap with positive area."""
+        if self._pairs is None:
+            pairs = []
+            active: List[int] = []
+            for i in self._order:
+                x0, y0, x1, y1 = self.boxes[i]
+                # Drop boxes that end before this one starts
+                active = [a for a in active if self.boxes[a][2] > x0]
+                for a in active:
+                    ay0, ay1 = self.boxes[a][1], self.boxes[a][3]
+                    if ay0 < y1 and y0 < ay1:
+                        pairs.append((a, i) if a < i else (i, a))
+                if x1 > x0:
+                    active.append(i)
+            pairs.sort()
+            self._pairs = pairs
+        return self._pairs
+
+    def query(self, box: Box) -> Iterator[int]:
+        """Indices of boxes overlapping `box`."""
+        qx0, qy0, qx1, qy1 = box
+        for i in self._order:
+            x0, y0, x1, y1 = self.boxes[i]
+            if x0 >= qx1:
+                break
+            if x1 > qx0 and y0 < qy1 and qy0 < y1:
+                yield i
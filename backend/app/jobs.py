@@ -0,0 +1,206 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from .cache import get_export_cache, export_render_key, export_filename
+from .compliance import check_file_size
+from .metrics import record_stage, events_total
+from .render import render_export
+from .schemas import ExportRequest, ExportResponse, ExportJobStatus
+from .variants import schedule_variants
+from .workers import WorkerPool, PoolBusy
+
+# Rendering is pure CPU (decode, resample, encode), one worker per core.
+EXPORT_WORKERS = int(os.environ.get("CREATIVEOS_EXPORT_WORKERS", os.cpu_count() or 1))
+EXPORT_MAX_PENDING = int(os.environ.get("CREATIVEOS_EXPORT_MAX_PENDING", EXPORT_WORKERS * 8))
+# Finished jobs kept around for polling before the oldest are forgotten
+EXPORT_JOB_HISTORY = int(os.environ.get("CREATIVEOS_EXPORT_JOB_HISTORY", 1000))
+
+
+class UnknownJob(KeyError):
+    pass
+
+
+class ExportJob:
+    def __init__(self, req: ExportRequest):
+        self.id = uuid.uuid4().hex
+        self.req = req
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+        self.task: Optional[asyncio.Task] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.error is not None:
+            return "failed"
+        if self.result is not None:
+            return "done"
+        if self.future is not None and self.future.running():
+            return "running"
+        return "queued"
+
+    def to_status(self) -> ExportJobStatus:
+        status = ExportJobStatus(job_id=self.id, status=self.status, error=self.error)
+        if self.result is not None:
+            status.result = ExportResponse(
+                url=f"/exports/{self.result['filename']}",
+                size_kb=self.result["size_bytes"] / 1024,
+                format=self.result["format"],
+                quality=self.result["quality"],
+                colors=self.result["colors"],
+                encode_passes=self.result["encode_passes"],
+                cached=self.result.get("cached", False),
+                thumbnail_url=f"/variants/exports/{self.result['filename']}?w=320",
+                file_size_check=check_file_size(
+                    self.result["size_bytes"],
+                    max_kb=self.result["max_bytes"] // 1024,
+                    passes=self.result["encode_passes"],
+                ),
+            )
+            status.queue_ms = max(0.0, (self.result["started_at"] - self.submitted_at) * 1000)
+            status.render_ms = self.result["timings"]["render_ms"]
+            status.encode_ms = self.result["timings"]["encode_ms"]
+        if self.finished_at is not None:
+            status.total_ms = (self.finished_at - self.submitted_at) * 1000
+        return status
+
+
+class ExportJobManager:
+    """
+    Export jobs rendered on a process pool.
+
+    `submit()` returns immediately with a job that clients can poll or
+    `wait()` on. Submission fails with `PoolBusy` once the pool's queue is
+    at capacity, so overload turns into fast 503s instead of growing latency.
+    """
+
+    def __init__(self, pool: WorkerPool, history: int = EXPORT_JOB_HISTORY):
+        self.pool = pool
+        self.history = history
+        self._jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+        # Render key -> job currently rendering it, so duplicates wait instead
+        self._inflight = {}
+        # Latest asset-cache stats reported by each worker process
+        self._worker_cache_stats = {}
+
+    def submit(self, req: ExportRequest) -> ExportJob:
+        self.pool.reserve()
+        job = ExportJob(req)
+        self._jobs[job.id] = job
+        self._trim()
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    def submit_many(self, reqs: List[ExportRequest]) -> List[ExportJob]:
+        """Submit all of `reqs` or none of them."""
+        free = self.pool.max_pending - self.pool.pending
+        if len(reqs) > free:
+            self.pool.rejected += 1
+            raise PoolBusy(f"{self.pool.name} pool cannot take {len(reqs)} jobs ({free} slots free)")
+        return [self.submit(req) for req in reqs]
+
+    async def _run(self, job: ExportJob):
+        def on_submit(future):
+            job.future = future
+        cache = get_export_cache()
+        handed_off = False
+        try:
+            # Identical request + identical asset bytes => reuse the earlier output
+            key = await run_in_threadpool(export_render_key, job.req)
+            hit = await run_in_threadpool(cache.get, key)
+            if hit is None and key in self._inflight:
+                await asyncio.shield(self._inflight[key].task)
+                hit = await run_in_threadpool(cache.get, key)
+            if hit is not None:
+                job.result = {**hit, "cached": True, "started_at": time.time(),
+                              "timings": {"render_ms": 0.0, "encode_ms": 0.0, "write_ms": 0.0}}
+                events_total.inc(event="export_cache_hit")
+                return
+
+            self._inflight[key] = job
+            handed_off = True
+            try:
+                job.result = await self.pool.run_reserved(
+                    render_export, job.req.model_dump(), None, export_filename(key, job.req), on_submit=on_submit
+                )
+            finally:
+                if self._inflight.get(key) is job:
+                    del self._inflight[key]
+            await run_in_threadpool(cache.put, key, job.result)
+            schedule_variants("exports", job.result["filename"])
+            self._worker_cache_stats[job.result["pid"]] = job.result["asset_cache"]
+            self._record_timings(job)
+            events_total.inc(event="export_done")
+        except Exception as e:
+            print(f"Export job {job.id} failed: {e}")
+            job.error = str(e) or e.__class__.__name__
+            events_total.inc(event="export_failed")
+        finally:
+            if not handed_off:
+                # Slot reserved in submit() but never used by a worker
+                self.pool.release()
+            job.finished_at = time.time()
+
+    def _record_timings(self, job: ExportJob):
+        # Stages were timed inside the worker; publish them from here
+        record_stage("export_queue", max(0.0, job.result["started_at"] - job.submitted_at))
+        for name, ms in job.result["timings"].items():
+            record_stage("export_" + name[:-3], ms / 1000)
+
+    def _trim(self):
+        # Forget the oldest finished jobs; never drop one still in flight
+        if len(self._jobs) <= self.history:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history:
+                break
+            if self._jobs[job_id].finished_at is not None:
+                del self._jobs[job_id]
+
+    def get(self, job_id: str) -> ExportJob:
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise UnknownJob(job_id)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> ExportJob:
+        job = self.get(job_id)
+        try:
+            await asyncio.wait_for(asyncio.shield(job.task), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    def stats(self) -> dict:
+        stats = self.pool.stats()
+        stats["tracked_jobs"] = len(self._jobs)
+        stats["asset_cache"] = self._asset_cache_totals()
+        stats["render_cache"] = get_export_cache().stats()
+        return stats
+
+    def _asset_cache_totals(self) -> dict:
+        totals = {"workers": len(self._worker_cache_stats), "entries": 0, "bytes": 0,
+                  "hits": 0, "misses": 0, "evictions": 0}
+        for worker in self._worker_cache_stats.values():
+            for k in ("entries", "bytes", "hits", "misses", "evictions"):
+                totals[k] += worker[k]
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_rate"] = totals["hits"] / lookups if lookups else 0.0
+        return totals
+
+    def shutdown(self):
+        self.pool.shutdown()
+
+
+export_jobs = ExportJobManager(
+    WorkerPool("export", max_workers=EXPORT_WORKERS, max_pending=EXPORT_MAX_PENDING)
+)
@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .compliance import (check_canvas_bounds, check_overlaps, check_safe_zones, is_9_16_canvas,
+                         SAFE_ZONE_TOP, SAFE_ZONE_BOTTOM)
+from .geometry import SpatialIndex, element_bbox
+from .schemas import LayoutElement, LayoutProposal
+
+# Time allowed for enumerating + scoring candidates on a cache miss
+LAYOUT_BUDGET_MS = float(os.environ.get("CREATIVEOS_LAYOUT_BUDGET_MS", 50))
+LAYOUT_CACHE_SIZE = 512
+
+ARRANGEMENTS = [
+    ("packshot_left", "Packshot Left"),
+    ("packshot_right", "Packshot Right"),
+    ("headline_top", "Headline Top"),
+    ("packshot_top", "Packshot Top"),
+    ("centered", "Centered Focus"),
+]
+PACKSHOT_SCALES = (0.7, 0.6, 0.5, 0.45, 0.4)
+# Headline size as a fraction of min(canvas w, h); subhead is half, min 24
+HEADLINE_SCALES = (0.08, 0.07, 0.06, 0.05, 0.04)
+TILE_CORNERS = ("top_right", "top_left", "bottom_right", "bottom_left")
+TEXT_COLOR = "#000000"
+MIN_FONT_SIZE = 24
+
+
+class Candidate:
+    __slots__ = ("arrangement", "name", "elements", "score")
+
+    def __init__(self, arrangement: str, name: str, elements: List[LayoutElement], score: float):
+        self.arrangement = arrangement
+        self.name = name
+        self.elements = elements
+        self.score = score
+
+
+def _safe_region(w: int, h: int) -> Tuple[float, float, float, float]:
+    margin = round(min(w, h) * 0.05)
+    if is_9_16_canvas(w, h):
+        return margin, SAFE_ZONE_TOP + margin / 2, w - margin, h - SAFE_ZONE_BOTTOM - margin / 2
+    return margin, margin, w - margin, h - margin
+
+
+def _fit(aspect: float, max_w: float, max_h: float) -> Tuple[float, float]:
+    """Largest w x h box with w/h == aspect inside max_w x max_h."""
+    if max_w / max_h > aspect:
+        return max_h * aspect, max_h
+    return max_w, max_w / aspect
+
+
+def _text(text: str, size: int, x: float = 0, y: float = 0, color: str = TEXT_COLOR) -> LayoutElement:
+    el = LayoutElement(type="text", x=x, y=y, text=text, font_size=size, font_family="Arial", color=color, z_index=2)
+    # Give text explicit geometry so every rule sees the same box
+    x0, y0, x1, y1 = element_bbox(el)
+    el.width, el.height = x1 - x0, y1 - y0
+    return el
+
+
+def _text_block(headline: str, subhead: Optional[str], size: int) -> List[LayoutElement]:
+    els = [_text(headline, size)]
+    if subhead:
+        els.append(_text(subhead, max(MIN_FONT_SIZE, size // 2)))
+    return els
+
+
+def _stack(els: List[LayoutElement], x: float, y: float, gap: float, center_width: Optional[float] = None):
+    for el in els:
+        el.x = x + (center_width - el.width) / 2 if center_width is not None else x
+        el.y = y
+        y += el.height + gap
+
+
+def _block_size(els: List[LayoutElement], gap: float) -> Tuple[float, float]:
+    return max(e.width for e in els), sum(e.height for e in els) + gap * (len(els) - 1)
+
+
+def _arrange(arrangement: str, region, aspect: float, scale: float, block: List[LayoutElement],
+             packshot_ref: str) -> Optional[Tuple[LayoutElement, float]]:
+    """Place packshot + text block; returns (packshot, balance) or None if it can't fit."""
+    left, top, right, bottom = region
+    rw, rh = right - left, bottom - top
+    gap = block[0].font_size * 0.3
+    bw, bh = _block_size(block, gap)
+    col_gap = rw * 0.04
+
+    if arrangement in ("packshot_left", "packshot_right"):
+        pw, ph = _fit(aspect, rw * scale, rh)
+        if bw > rw - pw - col_gap or bh > rh:
+            return None
+        px = left if arrangement == "packshot_left" else right - pw
+        py = top + (rh - ph) / 2
+        tx = px + pw + col_gap if arrangement == "packshot_left" else left
+        ty = top + (rh - bh) / 2
+        _stack(block, tx, ty, gap)
+        balance = 1 - abs((py + ph / 2) - (ty + bh / 2)) / rh
+    elif arrangement in ("headline_top", "packshot_top"):
+        pw, ph = _fit(aspect, rw, rh * scale)
+        if bw > rw or bh + ph + col_gap > rh:
+            return None
+        content_h = bh + col_gap + ph
+        y0 = top + (rh - content_h) / 2
+        px = left + (rw - pw) / 2
+        if arrangement == "headline_top":
+            _stack(block, left, y0, gap, center_width=rw)
+            py = y0 + bh + col_gap
+        else:
+            py = y0
+            _stack(block, left, y0 + ph + col_gap, gap, center_width=rw)
+        balance = 1.0
+    else:  # centered: headline above, subhead below the packshot
+        head, rest = block[0], block[1:]
+        rest_h = sum(e.height for e in rest) + gap * max(0, len(rest) - 1)
+        avail = rh - head.height - rest_h - 2 * col_gap
+        if avail <= 0 or bw > rw:
+            return None
+        pw, ph = _fit(aspect, rw, min(avail, rh * scale))
+        content_h = head.height + col_gap + ph + (col_gap + rest_h if rest else 0)
+        y0 = top + (rh - content_h) / 2
+        _stack([head], left, y0, gap, center_width=rw)
+        px, py = left + (rw - pw) / 2, y0 + head.height + col_gap
+        if rest:
+            _stack(rest, left, py + ph + col_gap, gap, center_width=rw)
+        balance = 1.0
+
+    packshot = LayoutElement(type="packshot", x=px, y=py, width=pw, height=ph, text=packshot_ref, z_index=1)
+    return packshot, balance
+
+
+def _tile(corner: str, region, size: float, tile_type: str) -> LayoutElement:
+    left, top, right, bottom = region
+    x = right - size if corner.endswith("right") else left
+    y = top if corner.startswith("top") else bottom - size
+    return LayoutElement(type="text", x=x, y=y, width=size, height=size, text="", tile_type=tile_type, z_index=3)
+
+
+def _passes_geometry(elements: List[LayoutElement], w: int, h: int) -> bool:
+    if not check_safe_zones(elements, w, h).passed:
+        return False
+    index = SpatialIndex([element_bbox(el) for el in elements])
+    return check_canvas_bounds(elements, w, h, index.boxes).passed and check_overlaps(elements, index).passed
+
+
+def _score(packshot: LayoutElement, block: List[LayoutElement], region, balance: float, w: int, h: int) -> float:
+    left, top, right, bottom = region
+    rw, rh = right - left, bottom - top
+    # Packshot should dominate without crowding: full marks at ~45% of the area
+    area = min(packshot.width * packshot.height / (rw * rh), 0.45) / 0.45
+    font = min(block[0].font_size / (0.07 * min(w, h)), 1.0)
+    xs = [packshot.x, packshot.x + packshot.width] + [e.x for e in block] + [e.x + e.width for e in block]
+    ys = [packshot.y, packshot.y + packshot.height] + [e.y for e in block] + [e.y + e.height for e in block]
+    fill = ((max(xs) - min(xs)) * (max(ys) - min(ys))) / (rw * rh)
+    return 0.4 * area + 0.3 * font + 0.2 * balance + 0.1 * min(fill / 0.8, 1.0)
+
+
+def enumerate_candidates(w: int, h: int, aspect: float, headline: str, subhead: Optional[str],
+                         value_tile: Optional[str], budget_ms: Optional[float] = None,
+                         packshot_ref: str = "") -> Tuple[List[Candidate], int]:
+    """
+    Enumerate arrangement x packshot scale x headline size (x tile corner)
+    candidates, dropping any that fail the geometry compliance rules.
+    Stops early when the time budget (default LAYOUT_BUDGET_MS) runs out.
+    Returns (valid, considered).
+    """
+    if budget_ms is None:
+        budget_ms = LAYOUT_BUDGET_MS
+    deadline = time.perf_counter() + budget_ms / 1000
+    region = _safe_region(w, h)
+    tile_size = round(min(region[2] - region[0], region[3] - region[1]) * 0.18)
+    corners = TILE_CORNERS if value_tile else (None,)
+    valid, considered = [], 0
+
+    for head_scale in HEADLINE_SCALES:
+        size = max(MIN_FONT_SIZE, round(min(w, h) * head_scale))
+        for arrangement, name in ARRANGEMENTS:
+            for scale in PACKSHOT_SCALES:
+                for corner in corners:
+                    if time.perf_counter() > deadline:
+                        return valid, considered
+                    considered += 1
+                    block = _text_block(headline, subhead, size)
+                    placed = _arrange(arrangement, region, aspect, scale, block, packshot_ref)
+                    if placed is None:
+                        continue
+                    packshot, balance = placed
+                    elements = [packshot] + block
+                    if corner:
+                        elements.append(_tile(corner, region, tile_size, value_tile))
+                    if not _passes_geometry(elements, w, h):
+                        continue
+                    valid.append(Candidate(arrangement, name, elements, _score(packshot, block, region, balance, w, h)))
+    return valid, considered
+
+
+_layout_cache: "OrderedDict[tuple, Tuple[dict, ...]]" = OrderedDict()
+_layout_cache_lock = threading.Lock()
+
+
+def clear_layout_cache():
+    with _layout_cache_lock:
+        _layout_cache.clear()
+
+
+def _top_layouts(w: int, h: int, aspect: float, headline: str, subhead: Optional[str],
+                 value_tile: Optional[str], count: int) -> Tuple[dict, ...]:
+    key = (w, h, aspect, headline, subhead, value_tile, count)
+    with _layout_cache_lock:
+        cached = _layout_cache.get(key)
+        if cached is not None:
+            _layout_cache.move_to_end(key)
+            return cached
+    candidates, considered = enumerate_candidates(w, h, aspect, headline, subhead, value_tile)
+    complete = considered == len(HEADLINE_SCALES) * len(ARRANGEMENTS) * len(PACKSHOT_SCALES) * (len(TILE_CORNERS) if value_tile else 1)
+    candidates.sort(key=lambda c: c.score, reverse=True)
+    # Best candidate per arrangement first so proposals actually differ
+    picked, seen = [], set()
+    for c in candidates:
+        if c.arrangement not in seen:
+            picked.append(c)
+            seen.add(c.arrangement)
+    picked += [c for c in candidates if c not in picked]
+    result = tuple(
+        {
+            "id": f"layout_{i + 1}",
+            "name": c.name,
+            "canvas_width": w,
+            "canvas_height": h,
+            "score": round(c.score, 4),
+            "elements": [e.model_dump() for e in c.elements],
+        }
+        for i, c in enumerate(picked[:count])
+    )
+    # A run cut short by the time budget reflects load at that moment; only memoize full ones
+    if complete:
+        with _layout_cache_lock:
+            _layout_cache[key] = result
+            while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+                _layout_cache.popitem(last=False)
+    return result
+
+
+def generate_layouts(packshot_ref: str, canvas_w: int, canvas_h: int, packshot_aspect: float = 1.0,
+                     headline: str = "Big Headline", subhead: Optional[str] = "Subheading",
+                     value_tile: Optional[str] = None, count: int = 3) -> List[LayoutProposal]:
+    """
+    Top `count` compliant layouts for this canvas and packshot aspect ratio.
+    Results are memoized per (canvas, aspect, element set); the packshot
+    reference is filled in afterwards so different uploads share entries.
+    """
+    # Round the aspect so near-identical packshots share a cache entry
+    aspect = round(max(0.1, min(packshot_aspect, 10.0)), 2)
+    proposals = []
+    for data in _top_layouts(canvas_w, canvas_h, aspect, headline, subhead, value_tile, count):
+        proposal = LayoutProposal(**data)
+        for el in proposal.elements:
+            if el.type == "packshot":
+                el.text = packshot_ref
+        proposals.append(proposal)
+    return proposals
@@ -1,15 +1,47 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, Response
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from .schemas import *
-from .utils import save_upload, UPLOAD_DIR, EXPORT_DIR
+from .utils import (save_upload_stream, read_image_meta, content_sha256, UploadTooLarge,
+                    UPLOAD_DIR, EXPORT_DIR, UPLOAD_MAX_MB)
 from .ai import remove_background_rembg, suggest_layouts
 from .compliance import validate_layout
+from .workers import rembg_pool, PoolBusy
+from .jobs import export_jobs, UnknownJob
+from .fonts import font_registry
+from .sessions import validation_sessions, UnknownSession, RevisionConflict, DeltaError
+from .compliance_batch import iter_validate_layouts
+from .retarget import retarget_elements
+from .render import render_preview, render_preview_job
+from .variants import (ImmutableStaticFiles, schedule_variants, source_path, get_variant, negotiate_format,
+                       available_formats, immutable_file_response, cache_control_for, FORMATS)
+from . import variants
+from .cache import get_rembg_cache, rembg_cache_key, link_or_copy
+from .records import LayoutRecord, parse_layout, parse_layouts, to_dicts
+from .serialization import decode_body, encode_response, dumps, loads, UnsupportedBody
+from .metrics import (registry, timer, record_stage, start_request, server_timing, request_seconds, requests_total,
+                      events_total, queue_gauge)
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+import asyncio
 import shutil
 import os
+import time
 import uuid
+from pathlib import Path
 
-app = FastAPI(title="CreativeOS Middleware")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Scan font dirs once, before any worker pool forks, so workers inherit it
+    font_registry.scan()
+    yield
+    # Worker pools are started lazily on first use; just tear them down here
+    rembg_pool.shutdown()
+    export_jobs.shutdown()
+    variants.shutdown()
+
+app = FastAPI(title="CreativeOS Middleware", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -20,24 +52,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    # Stages timed anywhere while serving this request end up in Server-Timing
+    stages = start_request()
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    total = time.perf_counter() - t0
+    # Label by route template so job/session ids don't explode cardinality
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    request_seconds.observe(total, route=route)
+    requests_total.inc(method=request.method, route=route, status=str(response.status_code))
+    response.headers["Server-Timing"] = server_timing(stages, total)
+    return response
+
 # Ensure directories exist
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(EXPORT_DIR, exist_ok=True)
 
 # Static
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
-app.mount("/exports", StaticFiles(directory=str(EXPORT_DIR)), name="exports")
+# Upload/export names are unique per content, so they are cacheable forever;
+# nobg_ cutouts are the exception and revalidate (see cache_control_for)
+app.mount("/uploads", ImmutableStaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+app.mount("/exports", ImmutableStaticFiles(directory=str(EXPORT_DIR)), name="exports")
 
 @app.get("/")
 async def root():
     return {"message": "CreativeOS Backend is running"}
 
 @app.post("/upload", response_model=Packshot)
-async def upload_file(file: UploadFile = File(...)):
-    content = await file.read()
-    filename = save_upload(content, file.filename)
-    # In real app, we'd get dimensions from image
-    return Packshot(id=filename, url=f"/uploads/{filename}", width=1000, height=1000)
+async def upload_file(request: Request, file: UploadFile = File(...)):
+    # Cheap early reject before touching the body
+    max_bytes = UPLOAD_MAX_MB * 1024 * 1024
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + 64 * 1024:
+        raise HTTPException(413, f"Upload exceeds {UPLOAD_MAX_MB}MB limit")
+    try:
+        with timer("upload_write"):
+            filename, size, digest = await save_upload_stream(file, file.filename or "upload", max_bytes)
+    except UploadTooLarge as e:
+        raise HTTPException(413, str(e))
+
+    # Header-only read: dimensions and format without decoding pixels
+    with timer("upload_probe"):
+        meta = await run_in_threadpool(read_image_meta, UPLOAD_DIR / filename)
+    if meta is None:
+        (UPLOAD_DIR / filename).unlink(missing_ok=True)
+        raise HTTPException(400, "Unsupported or corrupt image file")
+    width, height, fmt = meta
+    # Thumbnails/WebP for the editor, built after we respond
+    schedule_variants("uploads", filename)
+    return Packshot(id=filename, url=f"/uploads/{filename}", width=width, height=height,
+                    format=fmt, size_bytes=size, sha256=digest,
+                    thumbnail_url=f"/variants/uploads/{filename}?w=320")
 
 @app.post("/remove-bg")
 async def remove_bg(packshot_id: str):
@@ -50,89 +117,356 @@ async def remove_bg(packshot_id: str):
     base_name = os.path.splitext(packshot_id)[0]
     output_filename = f"nobg_{base_name}.png"
     output_path = UPLOAD_DIR / output_filename
+
+    # Same bytes + same model/settings => same cutout. Serve repeats from cache.
+    cache = get_rembg_cache()
+    with timer("rembg_hash"):
+        source_hash = await run_in_threadpool(content_sha256, input_path)
+    cache_key = rembg_cache_key(source_hash)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        with timer("rembg_cache_copy"):
+            await run_in_threadpool(link_or_copy, cached, output_path)
+        events_total.inc(event="rembg_cache_hit")
+        return {"url": f"/uploads/{output_filename}", "cached": True}
+    events_total.inc(event="rembg_cache_miss")
     
-    success = remove_background_rembg(str(input_path), str(output_path))
+    # Inference is CPU-bound and takes seconds, so it runs in the worker pool
+    # (each worker keeps a preloaded session) instead of on the event loop.
+    try:
+        with timer("rembg_inference"):
+            success = await rembg_pool.run(remove_background_rembg, str(input_path), str(output_path))
+    except PoolBusy as e:
+        events_total.inc(event="rembg_rejected")
+        raise HTTPException(503, str(e), headers={"Retry-After": "2"})
+    except Exception as e:
+        # Worker crashed (e.g. OOM) - treat like an inference failure
+        print(f"Rembg worker failed: {e}")
+        success = False
     if success:
-        return {"url": f"/uploads/{output_filename}"}
+        await run_in_threadpool(cache.put_file, cache_key, output_path)
+        schedule_variants("uploads", output_filename)
+        return {"url": f"/uploads/{output_filename}", "cached": False}
     else:
+        events_total.inc(event="rembg_failed")
         return {"url": f"/uploads/{packshot_id}", "details": "Background removal failed, returned original"}
 
+@app.get("/remove-bg/cache")
+async def remove_bg_cache_stats():
+    return get_rembg_cache().stats()
+
+@app.delete("/remove-bg/cache")
+async def remove_bg_cache_invalidate():
+    # Call after swapping the model files in place (same name, new weights)
+    cache = get_rembg_cache()
+    cache.invalidate()
+    return cache.stats()
+
+@app.get("/variants/{kind}/{filename}")
+async def get_variant_file(kind: str, filename: str, request: Request, w: int = 320, fmt: Optional[str] = None):
+    """
+    Resized/re-encoded copy of an upload or export, e.g.
+    /variants/uploads/<id>.png?w=320&fmt=webp. Widths snap up to the
+    configured variant widths (never above the original). Without `fmt` the
+    best format in the Accept header is picked.
+    """
+    source = source_path(kind, filename)
+    if source is None:
+        raise HTTPException(404, "File not found")
+    if w < 1:
+        raise HTTPException(400, "w must be positive")
+    vary = None
+    if fmt is None:
+        fmt, vary = negotiate_format(request.headers.get("accept"), source), "Accept"
+    elif fmt not in available_formats():
+        raise HTTPException(400, f"fmt must be one of: {', '.join(available_formats())}")
+    with timer("variant"):
+        path = await run_in_threadpool(get_variant, kind, filename, w, fmt)
+    if path is None:
+        raise HTTPException(404, "Variant not available")
+    return immutable_file_response(path, FORMATS[fmt], request.headers.get("if-none-match"),
+                                   cache_control_for(filename), vary)
+
+async def _read_layout(request: Request) -> LayoutRecord:
+    """
+    ValidationRequest body (JSON, or MessagePack if the msgpack package is
+    installed) as compact element records. Well-typed payloads skip model
+    construction; anything else goes through pydantic for coercion and errors.
+    """
+    body = await request.body()
+    with timer("request_parse"):
+        try:
+            return parse_layout(decode_body(body, request.headers.get("content-type", "")))
+        except UnsupportedBody as e:
+            raise HTTPException(415, str(e))
+        except ValidationError as e:
+            raise HTTPException(422, e.errors())
+        except ValueError as e:
+            raise HTTPException(422, str(e))
+
+# Endpoints that read the body themselves still document it
+_LAYOUT_SCHEMA = {"$ref": "#/components/schemas/ValidationRequest"}
+LAYOUT_BODY_DOCS = {"requestBody": {"required": True, "content": {
+    "application/json": {"schema": _LAYOUT_SCHEMA},
+    "application/msgpack": {"schema": _LAYOUT_SCHEMA},
+}}}
+
+def _respond(request: Request, content):
+    # JSON via orjson, or MessagePack when the client's Accept asks for it
+    with timer("response_encode"):
+        return encode_response(content, request.headers.get("accept"))
+
 @app.post("/suggest-layouts", response_model=List[LayoutProposal])
-async def get_layouts(req: LayoutRequest):
-    return suggest_layouts(req.packshot_id, req.width, req.height)
-
-class ValidationRequest(BaseModel):
-    width: int
-    height: int
-    elements: List[LayoutElement]
-
-@app.post("/validate", response_model=ValidationReport)
-async def validate(req: ValidationRequest):
-    # Adapter to match existing compliance functions
-    layout_req = LayoutRequest(packshot_id="check", width=req.width, height=req.height)
-    return validate_layout(layout_req, req.elements)
-
-@app.post("/auto-fix", response_model=List[LayoutElement])
-async def auto_fix(req: ValidationRequest):
+async def get_layouts(req: LayoutRequest, request: Request):
+    # Lay out around the packshot's real shape; header-only read
+    meta = await run_in_threadpool(read_image_meta, UPLOAD_DIR / Path(req.packshot_id).name)
+    aspect = meta[0] / meta[1] if meta and meta[1] else 1.0
+    with timer("layout_suggest"):
+        proposals = await run_in_threadpool(suggest_layouts, req.packshot_id, req.width, req.height, aspect,
+                                            headline=req.headline, subhead=req.subhead,
+                                            value_tile=req.value_tile, count=req.count)
+    return _respond(request, [p.model_dump() for p in proposals])
+
+@app.post("/validate", response_model=ValidationReport, openapi_extra=LAYOUT_BODY_DOCS)
+async def validate(request: Request):
+    """Body: ValidationRequest. Reply negotiated by Accept (JSON or MessagePack)."""
+    layout = await _read_layout(request)
+    # Adapter to match existing compliance functions (the layout is already validated)
+    layout_req = LayoutRequest.model_construct(packshot_id="check", width=layout.width, height=layout.height)
+    with timer("validate"):
+        report = validate_layout(layout_req, layout.elements)
+    return _respond(request, report.model_dump())
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _parse_batch_layouts(body: bytes, content_type: str) -> List[LayoutRecord]:
+    try:
+        if content_type.startswith(NDJSON_MEDIA_TYPE) or content_type.startswith("application/ndjson"):
+            layouts = []
+            for line_no, line in enumerate(body.splitlines(), start=1):
+                if line.strip():
+                    try:
+                        layouts.append(parse_layout(loads(line)))
+                    except ValidationError as e:
+                        raise HTTPException(422, f"Line {line_no}: {e.errors()}")
+                    except ValueError as e:
+                        raise HTTPException(422, f"Line {line_no}: Invalid JSON: {e}")
+            return layouts
+        return parse_layouts(decode_body(body, content_type))
+    except UnsupportedBody as e:
+        raise HTTPException(415, str(e))
+    except ValidationError as e:
+        raise HTTPException(422, e.errors())
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+
+@app.post("/validate/batch")
+async def validate_batch(request: Request):
+    """
+    Validate many layouts in one call. Body is either JSON
+    `{"layouts": [...]}` or NDJSON with one ValidationRequest per line.
+    Reports stream back as NDJSON, `{"index": i, "report": {...}}` per line,
+    in input order.
+    """
+    body = await request.body()
+    with timer("request_parse"):
+        layouts = _parse_batch_layouts(body, request.headers.get("content-type", ""))
+
+    def lines():
+        # Sync generator: Starlette iterates it in the threadpool
+        for i, report in enumerate(iter_validate_layouts(layouts)):
+            yield dumps({"index": i, "report": report.model_dump()}) + b"\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+@app.post("/validate/sessions", response_model=ValidationSessionResponse)
+async def open_validation_session(req: ValidationRequest):
+    # Elements are addressed by `id` in later deltas; ones without get "el-<index>"
+    try:
+        session = validation_sessions.open(req.width, req.height, req.elements)
+    except DeltaError as e:
+        raise HTTPException(422, str(e))
+    with session.lock:
+        return ValidationSessionResponse(session_id=session.id, revision=session.revision, report=session.report())
+
+@app.post("/validate/sessions/{session_id}/deltas", response_model=ValidationDeltaResponse)
+async def apply_validation_deltas(session_id: str, req: ValidationDeltaRequest):
+    try:
+        session = validation_sessions.get(session_id)
+    except UnknownSession:
+        raise HTTPException(404, "Validation session not found")
+    with session.lock:
+        try:
+            overall, changed = session.apply(req.base_revision, req.deltas)
+        except RevisionConflict as e:
+            raise HTTPException(409, {"message": str(e), "revision": e.current})
+        except (DeltaError, ValidationError) as e:
+            raise HTTPException(422, str(e))
+        return ValidationDeltaResponse(session_id=session.id, revision=session.revision,
+                                       overall_pass=overall, changed=changed)
+
+@app.delete("/validate/sessions/{session_id}")
+async def close_validation_session(session_id: str):
+    try:
+        validation_sessions.close(session_id)
+    except UnknownSession:
+        raise HTTPException(404, "Validation session not found")
+    return {"closed": session_id}
+
+@app.post("/auto-fix", response_model=List[LayoutElement], openapi_extra=LAYOUT_BODY_DOCS)
+async def auto_fix(request: Request):
+    """Body: ValidationRequest. Reply negotiated by Accept (JSON or MessagePack)."""
     from .compliance import auto_fix_elements
-    return auto_fix_elements(req.elements, req.width, req.height)
+    layout = await _read_layout(request)
+    with timer("auto_fix"):
+        fixed = auto_fix_elements(layout.elements, layout.width, layout.height)
+    return _respond(request, to_dicts(fixed))
 
 @app.post("/export", response_model=ExportResponse)
 async def export_layout(req: ExportRequest):
-    from PIL import Image, ImageDraw, ImageFont, ImageColor
-    
-    # Create canvas with background color
-    bg_color = req.background_color or "#ffffff"
+    # Same job path as /export/jobs, but waits for the result
+    job = _submit_export(req)
+    await export_jobs.wait(job.id)
+    status = job.to_status()
+    if status.status == "failed":
+        raise HTTPException(500, f"Export failed: {status.error}")
+    return status.result
+
+PREVIEW_BOUNDARY = "preview-frame"
+
+def _preview_scales(raw: str) -> List[float]:
     try:
-        img = Image.new("RGB", (req.canvas_width, req.canvas_height), ImageColor.getrgb(bg_color))
-    except:
-        img = Image.new("RGB", (req.canvas_width, req.canvas_height), "white")
-        
-    draw = ImageDraw.Draw(img)
-    
-    # Sort elements by z_index
-    sorted_elements = sorted(req.elements, key=lambda e: e.z_index or 0)
-    
-    for el in sorted_elements:
-        if el.type == "text" and el.text:
-            text_color = el.color or "#000000"
-            font_size = el.font_size or 24
-            
-            # Simple fallback font logic
+        scales = sorted({float(s) for s in raw.split(",") if s.strip()})
+    except ValueError:
+        raise HTTPException(400, "scales must be comma-separated numbers")
+    if not scales or scales[0] <= 0 or scales[-1] > 1:
+        raise HTTPException(400, "scales must be in (0, 1]")
+    return scales
+
+# Previews up to this scale are small enough to render in the API process;
+# larger ones are close to a full render and go to the export workers
+PREVIEW_INLINE_MAX_SCALE = 0.5
+
+async def _render_preview(req: ExportRequest, scale: float):
+    """Raises PoolBusy if a large preview can't get an export worker slot."""
+    if scale <= PREVIEW_INLINE_MAX_SCALE:
+        timings = {}
+        data, media_type = await run_in_threadpool(render_preview, req, scale, timings)
+    else:
+        data, media_type, timings = await export_jobs.pool.run(render_preview_job, req, scale)
+    record_stage("preview_render", timings["render_ms"] / 1000)
+    record_stage("preview_encode", timings["encode_ms"] / 1000)
+    return data, media_type
+
+@app.post("/export/preview")
+async def export_preview(req: ExportRequest, scale: float = 0.25):
+    """
+    Render at `scale` (default 1/4) from cached downsampled assets and return
+    the image bytes. Scales up to PREVIEW_INLINE_MAX_SCALE render in this
+    process, larger ones on the export workers (503 if they are full).
+    Nothing is written to EXPORT_DIR.
+    """
+    try:
+        data, media_type = await _render_preview(req, _preview_scales(str(scale))[0])
+    except PoolBusy as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+    return Response(data, media_type=media_type, headers={"Cache-Control": "no-store"})
+
+@app.post("/export/preview/stream")
+async def export_preview_stream(req: ExportRequest, scales: str = "0.25,1"):
+    """
+    Progressive preview: a multipart/x-mixed-replace stream with one frame
+    per scale, coarsest first, so the editor can show something immediately
+    and swap in sharper frames as they arrive.
+    """
+    steps = _preview_scales(scales)
+
+    async def frames():
+        for scale in steps:
             try:
-                # Try to load a standard font. On Windows 'arial.ttf', Linux 'DejaVuSans.ttf' often exists
-                # For this environment, we try a few common ones
-                font_path = "arial.ttf" 
-                font = ImageFont.truetype(font_path, size=int(font_size))
-            except IOError:
-                # If fail, use default (size is fixed in default, sadly)
-                font = ImageFont.load_default()
-            
-            draw.text((el.x, el.y), el.text, fill=text_color, font=font)
-            
-        elif el.type == "packshot" or el.type == "image" or el.type == "logo":
-             if el.text and "/uploads/" in el.text:
-                 fname = el.text.split("/uploads/")[-1]
-                 fpath = UPLOAD_DIR / fname
-                 if fpath.exists():
-                     try:
-                         p_img = Image.open(fpath).convert("RGBA")
-                         # Resize
-                         if el.width and el.height:
-                             p_img = p_img.resize((int(el.width), int(el.height)), Image.Resampling.LANCZOS)
-                         
-                         # Paste with alpha
-                         img.paste(p_img, (int(el.x), int(el.y)), p_img)
-                     except Exception as e:
-                         print(f"Error rendering image {fname}: {e}")
-             else:
-                 # Draw placeholder
-                 draw.rectangle([el.x, el.y, el.x+(el.width or 100), el.y+(el.height or 100)], outline="gray", width=2)
-
-    filename = f"export_{req.canvas_width}x{req.canvas_height}_{uuid.uuid4().hex[:6]}.jpg"
-    out_path = EXPORT_DIR / filename
-    
-    img.save(out_path, format="JPEG", quality=95)
-    size = os.path.getsize(out_path)
-        
-    return ExportResponse(url=f"/exports/{filename}", size_kb=size/1024)
+                data, media_type = await _render_preview(req, scale)
+            except PoolBusy:
+                break  # Headers are sent; end early and the client keeps the coarser frame
+            head = (f"--{PREVIEW_BOUNDARY}\r\nContent-Type: {media_type}\r\n"
+                    f"Content-Length: {len(data)}\r\nX-Preview-Scale: {scale}\r\n\r\n")
+            yield head.encode() + data + b"\r\n"
+        yield f"--{PREVIEW_BOUNDARY}--\r\n".encode()
+
+    return StreamingResponse(frames(), media_type=f"multipart/x-mixed-replace; boundary={PREVIEW_BOUNDARY}",
+                             headers={"Cache-Control": "no-store"})
+
+def _submit_export(req: ExportRequest):
+    try:
+        return export_jobs.submit(req)
+    except PoolBusy as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+
+def _get_export_job(job_id: str):
+    try:
+        return export_jobs.get(job_id)
+    except UnknownJob:
+        raise HTTPException(404, "Export job not found")
+
+@app.post("/export/jobs", response_model=ExportJobStatus, status_code=202)
+async def submit_export_job(req: ExportRequest):
+    return _submit_export(req).to_status()
+
+@app.get("/export/jobs/{job_id}", response_model=ExportJobStatus)
+async def get_export_job(job_id: str):
+    return _get_export_job(job_id).to_status()
+
+@app.get("/export/jobs/{job_id}/wait", response_model=ExportJobStatus)
+async def wait_export_job(job_id: str, timeout: float = 30.0):
+    _get_export_job(job_id)
+    job = await export_jobs.wait(job_id, timeout=min(max(timeout, 0.0), 120.0))
+    return job.to_status()
+
+@app.post("/export/batch", response_model=BatchExportResponse)
+async def export_batch(req: BatchExportRequest):
+    """
+    Render one layout to several placements. Each target is retargeted
+    (scaled + reflowed) and rendered as its own job, so targets run in
+    parallel across export workers, which share decoded assets and fonts
+    through their per-process caches.
+    """
+    if not req.targets:
+        raise HTTPException(400, "No export targets given")
+    started = time.perf_counter()
+    reqs = [
+        ExportRequest(
+            canvas_width=t.width,
+            canvas_height=t.height,
+            elements=retarget_elements(req.elements, req.canvas_width, req.canvas_height,
+                                       t.width, t.height, req.scaling, req.reflow),
+            background_color=req.background_color,
+            format=req.format,
+            max_kb=req.max_kb,
+        )
+        for t in req.targets
+    ]
+    try:
+        jobs = export_jobs.submit_many(reqs)
+    except PoolBusy as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+    await asyncio.gather(*(export_jobs.wait(job.id) for job in jobs))
+
+    items = []
+    for target, job in zip(req.targets, jobs):
+        status = job.to_status()
+        items.append(BatchExportItem(
+            name=target.name, width=target.width, height=target.height, job_id=job.id,
+            result=status.result, error=status.error, render_ms=status.render_ms,
+        ))
+    return BatchExportResponse(items=items, total_ms=(time.perf_counter() - started) * 1000)
+
+@app.get("/export/queue")
+async def export_queue_stats():
+    return export_jobs.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Pool state is sampled at scrape time rather than tracked per event
+    for name, stats in (("export", export_jobs.pool.stats()), ("rembg", rembg_pool.stats())):
+        for key in ("pending", "completed", "failed", "rejected"):
+            queue_gauge.set(stats.get(key, 0), pool=name, stat=key)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
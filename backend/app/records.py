@@ -0,0 +1,170 @@
+from typing import Any, Dict, List, NamedTuple, Optional, get_args
+
+from .schemas import LayoutElement, ValidationRequest, BatchValidationRequest
+
+# Same fields, in the same order, as the LayoutElement model
+ELEMENT_FIELDS = tuple(LayoutElement.model_fields)
+ELEMENT_DEFAULTS = {name: f.default for name, f in LayoutElement.model_fields.items() if not f.is_required()}
+ELEMENT_TYPES = frozenset(get_args(LayoutElement.model_fields["type"].annotation))
+TILE_TYPES = frozenset(get_args(get_args(LayoutElement.model_fields["tile_type"].annotation)[0]))
+
+FLOAT_FIELDS = ("x", "y", "width", "height")
+INT_FIELDS = ("font_size", "z_index")
+STR_FIELDS = ("text", "font_family", "color", "id", "price", "regular_price", "end_date")
+
+_MISSING = object()
+
+
+class ElementRecord:
+    """
+    Plain, slotted stand-in for LayoutElement with the same attributes.
+    Compliance, geometry and the renderer only read attributes, so they
+    take either; records skip model construction and validation, which
+    dominates on layouts with hundreds of elements. Build them with
+    `parse_element` (untrusted input) or `from_dict` (already validated).
+    """
+
+    __slots__ = ELEMENT_FIELDS
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ElementRecord":
+        rec = cls.__new__(cls)
+        for name in ELEMENT_FIELDS:
+            setattr(rec, name, data.get(name, ELEMENT_DEFAULTS.get(name)))
+        return rec
+
+    @classmethod
+    def from_model(cls, el: LayoutElement) -> "ElementRecord":
+        rec = cls.__new__(cls)
+        for name in ELEMENT_FIELDS:
+            setattr(rec, name, getattr(el, name))
+        return rec
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in ELEMENT_FIELDS}
+        # Records are assigned to freely (auto-fix writes ints); keep coordinates floats like the model
+        for name in FLOAT_FIELDS:
+            data[name] = float(data[name])
+        return data
+
+    def __copy__(self) -> "ElementRecord":
+        rec = ElementRecord.__new__(ElementRecord)
+        for name in ELEMENT_FIELDS:
+            setattr(rec, name, getattr(self, name))
+        return rec
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ElementRecord):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in ELEMENT_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"ElementRecord({self.type!r}, x={self.x}, y={self.y}, text={self.text!r})"
+
+
+class LayoutRecord(NamedTuple):
+    # Shape of ValidationRequest, for the validators
+    width: int
+    height: int
+    elements: List[ElementRecord]
+
+
+class ExportRecord(NamedTuple):
+    # Shape of ExportRequest, for the renderer
+    canvas_width: int
+    canvas_height: int
+    elements: List[ElementRecord]
+    background_color: Optional[str]
+    format: str
+    max_kb: Optional[int]
+
+
+def parse_element(data: Any) -> Optional[ElementRecord]:
+    """
+    Record for an element dict whose values already have their final types,
+    or None for anything else (coercible strings, bad values), which the
+    caller hands to pydantic for coercion and error messages.
+    """
+    if type(data) is not dict or data.get("type") not in ELEMENT_TYPES:
+        return None
+    rec = ElementRecord.__new__(ElementRecord)
+    rec.type = data["type"]
+    for name in FLOAT_FIELDS:
+        v = data.get(name, _MISSING)
+        if v is _MISSING:
+            if name not in ELEMENT_DEFAULTS:
+                return None
+            v = ELEMENT_DEFAULTS[name]
+        elif type(v) is int or type(v) is float:
+            v = float(v)
+        else:
+            return None
+        setattr(rec, name, v)
+    for name in INT_FIELDS:
+        v = data.get(name, ELEMENT_DEFAULTS[name])
+        if v is not None and type(v) is not int:
+            return None
+        setattr(rec, name, v)
+    for name in STR_FIELDS:
+        v = data.get(name)
+        if v is not None and type(v) is not str:
+            return None
+        setattr(rec, name, v)
+    tile_type = data.get("tile_type")
+    if tile_type is not None and tile_type not in TILE_TYPES:
+        return None
+    rec.tile_type = tile_type
+    return rec
+
+
+def _layout_fast(data: Any) -> Optional[LayoutRecord]:
+    if type(data) is not dict:
+        return None
+    width, height, items = data.get("width"), data.get("height"), data.get("elements")
+    if type(width) is not int or type(height) is not int or type(items) is not list:
+        return None
+    elements = []
+    for item in items:
+        rec = parse_element(item)
+        if rec is None:
+            return None
+        elements.append(rec)
+    return LayoutRecord(width, height, elements)
+
+
+def layout_from_request(req: ValidationRequest) -> LayoutRecord:
+    return LayoutRecord(req.width, req.height, [ElementRecord.from_model(el) for el in req.elements])
+
+
+def parse_layout(data: Any) -> LayoutRecord:
+    """ValidationRequest-shaped data as records. Raises pydantic's ValidationError like the model would."""
+    layout = _layout_fast(data)
+    if layout is None:
+        layout = layout_from_request(ValidationRequest.model_validate(data))
+    return layout
+
+
+def parse_layouts(data: Any) -> List[LayoutRecord]:
+    """`{"layouts": [...]}` as records, falling back to BatchValidationRequest as a whole."""
+    if type(data) is dict and type(data.get("layouts")) is list:
+        layouts = [_layout_fast(item) for item in data["layouts"]]
+        if None not in layouts:
+            return layouts
+    return [layout_from_request(req) for req in BatchValidationRequest.model_validate(data).layouts]
+
+
+def export_record(data: Dict[str, Any]) -> ExportRecord:
+    """ExportRequest.model_dump() output as records, without re-validating it."""
+    return ExportRecord(
+        canvas_width=data["canvas_width"],
+        canvas_height=data["canvas_height"],
+        elements=[ElementRecord.from_dict(el) for el in data["elements"]],
+        background_color=data.get("background_color"),
+        format=data.get("format", "jpg"),
+        max_kb=data.get("max_kb"),
+    )
+
+
+def to_dicts(elements) -> List[Dict[str, Any]]:
+    """Elements (records or models) as response-ready dicts."""
+    return [el.to_dict() if isinstance(el, ElementRecord) else el.model_dump() for el in elements]
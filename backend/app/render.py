@@ -0,0 +1,203 @@
+import io
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageColor
+
+from .assets import asset_cache
+from .encode import encode_to_budget, EXPORT_MAX_KB
+from .fonts import get_font
+from .geometry import text_layout
+from .records import export_record
+from .schemas import ExportRequest
+from .utils import UPLOAD_DIR, EXPORT_DIR, read_image_meta
+
+IMAGE_TYPES = ("packshot", "image", "logo")
+PREVIEW_JPEG_QUALITY = 80
+# Bump when rendering output changes for the same request, so cached exports are redone
+RENDER_VERSION = "2"
+
+
+def _asset_path(el) -> Optional[Path]:
+    """Upload an image element points at, if any (it may not exist)."""
+    if el.type in IMAGE_TYPES and el.text and "/uploads/" in el.text:
+        return UPLOAD_DIR / el.text.split("/uploads/")[-1]
+    return None
+
+
+def render_layout(req: ExportRequest, timings: Optional[Dict[str, float]] = None, preview: bool = False) -> Image.Image:
+    """
+    Draw an ExportRequest onto a new RGB canvas. If `timings` is given,
+    milliseconds spent per sub-stage (assets, fonts, text, paste) are added to it.
+    `preview` resizes images from cached reduced sources (faster, slightly softer).
+    """
+    timings = timings if timings is not None else {}
+    for stage in ("assets_ms", "fonts_ms", "text_ms", "paste_ms"):
+        timings.setdefault(stage, 0.0)
+    clock = time.perf_counter
+
+    # Create canvas with background color
+    bg_color = req.background_color or "#ffffff"
+    try:
+        img = Image.new("RGB", (req.canvas_width, req.canvas_height), ImageColor.getrgb(bg_color))
+    except:
+        img = Image.new("RGB", (req.canvas_width, req.canvas_height), "white")
+
+    draw = ImageDraw.Draw(img)
+
+    # Sort elements by z_index
+    sorted_elements = sorted(req.elements, key=lambda e: e.z_index or 0)
+
+    for el in sorted_elements:
+        if el.type == "text" and el.text:
+            text_color = el.color or "#000000"
+            font_size = el.font_size or 24
+
+            # Faces are cached per (family, size) by the registry
+            t = clock()
+            font = get_font(el.font_family, font_size)
+            t1 = clock()
+            # Same wrapped lines the compliance checks measured
+            layout = text_layout(el)
+            for i, line in enumerate(layout.lines):
+                draw.text((el.x, el.y + i * layout.line_height), line, fill=text_color, font=font)
+            timings["fonts_ms"] += (t1 - t) * 1000
+            timings["text_ms"] += (clock() - t1) * 1000
+
+        elif el.type in IMAGE_TYPES:
+             fpath = _asset_path(el)
+             if fpath is not None:
+                 fname = fpath.name
+                 if fpath.exists():
+                     try:
+                         # Decoded + resized tiles are cached per (file, mtime, size)
+                         t = clock()
+                         if el.width and el.height:
+                             p_img = asset_cache.get_tile(fpath, el.width, el.height, reduced=preview)
+                         else:
+                             p_img = asset_cache.get_source(fpath)
+                         t1 = clock()
+
+                         # Paste with alpha
+                         img.paste(p_img, (int(el.x), int(el.y)), p_img)
+                         timings["assets_ms"] += (t1 - t) * 1000
+                         timings["paste_ms"] += (clock() - t1) * 1000
+                     except Exception as e:
+                         print(f"Error rendering image {fname}: {e}")
+             else:
+                 # Draw placeholder
+                 draw.rectangle([el.x, el.y, el.x+(el.width or 100), el.y+(el.height or 100)], outline="gray", width=2)
+
+    return img
+
+
+def _natural_size(el) -> Tuple[float, float]:
+    """(width, height) render_layout draws `el` at: its own, or the asset's if either is unset."""
+    if el.type in IMAGE_TYPES and not (el.width and el.height):
+        path = _asset_path(el)
+        meta = read_image_meta(path) if path is not None else None
+        if meta is not None:
+            return meta[0], meta[1]
+    return el.width, el.height
+
+
+def scale_request(req: ExportRequest, scale: float) -> ExportRequest:
+    """
+    `req` with the canvas and every element's geometry and font size scaled.
+    Images drawn at their file's own size get that size, scaled, so they
+    shrink with the canvas.
+    """
+    def s(v):
+        return v * scale if v is not None else None
+    elements = []
+    for el in req.elements:
+        width, height = _natural_size(el)
+        elements.append(el.model_copy(update={
+            "x": el.x * scale, "y": el.y * scale, "width": s(width), "height": s(height),
+            "font_size": max(1, round(el.font_size * scale)) if el.font_size else None,
+        }))
+    return req.model_copy(update={
+        "canvas_width": max(1, round(req.canvas_width * scale)),
+        "canvas_height": max(1, round(req.canvas_height * scale)),
+        "elements": elements,
+    })
+
+
+def render_preview(req: ExportRequest, scale: float, timings: Optional[Dict[str, float]] = None) -> Tuple[bytes, str]:
+    """
+    Render `req` at `scale` and encode it in memory for the editor.
+    Nothing is written to disk and there is no size-budget search: one fast
+    JPEG (or low-effort PNG) pass. Returns (bytes, media type).
+    """
+    timings = timings if timings is not None else {}
+    t0 = time.perf_counter()
+    img = render_layout(scale_request(req, scale), timings, preview=True)
+    t1 = time.perf_counter()
+    buf = io.BytesIO()
+    if req.format == "png":
+        img.save(buf, "PNG", compress_level=1)
+        media_type = "image/png"
+    else:
+        img.save(buf, "JPEG", quality=PREVIEW_JPEG_QUALITY)
+        media_type = "image/jpeg"
+    timings["render_ms"] = (t1 - t0) * 1000
+    timings["encode_ms"] = (time.perf_counter() - t1) * 1000
+    return buf.getvalue(), media_type
+
+
+def render_preview_job(req: ExportRequest, scale: float) -> Tuple[bytes, str, Dict[str, float]]:
+    """render_preview for an export worker process; timings come back with the result."""
+    timings: Dict[str, float] = {}
+    data, media_type = render_preview(req, scale, timings)
+    return data, media_type, timings
+
+
+def render_export(req_data: dict, out_dir: Optional[Path] = None, filename: Optional[str] = None) -> dict:
+    """
+    Render and save one export. Runs inside an export worker process, so it
+    takes and returns plain dicts (cheap to pickle) rather than models.
+    `filename` pins the output name (the render cache derives it from the
+    request); it is written via a temp file so readers never see a partial file.
+    """
+    started_at = time.time()
+    t0 = time.perf_counter()
+    # Already validated by the API; rebuilding models here would cost more than small renders
+    req = export_record(req_data)
+    stages: Dict[str, float] = {}
+    img = render_layout(req, stages)
+    t1 = time.perf_counter()
+
+    # Encode in memory until the size budget is met, then write once
+    result = encode_to_budget(img, req.format, req.max_kb or EXPORT_MAX_KB)
+    t2 = time.perf_counter()
+
+    out_dir = Path(out_dir) if out_dir is not None else EXPORT_DIR
+    filename = filename or f"export_{req.canvas_width}x{req.canvas_height}_{uuid.uuid4().hex[:6]}.{result.extension}"
+    tmp = out_dir / f".{filename}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(result.data)
+    os.replace(tmp, out_dir / filename)
+    t3 = time.perf_counter()
+
+    return {
+        "pid": os.getpid(),
+        "asset_cache": asset_cache.stats(),
+        "filename": filename,
+        "size_bytes": result.size,
+        "max_bytes": result.max_bytes,
+        "format": result.format,
+        "quality": result.quality,
+        "colors": result.colors,
+        "encode_passes": result.passes,
+        "started_at": started_at,
+        "timings": {
+            "render_ms": (t1 - t0) * 1000,
+            "encode_ms": (t2 - t1) * 1000,
+            "write_ms": (t3 - t2) * 1000,
+            # Breakdown of render_ms
+            **stages,
+        },
+    }
@@ -0,0 +1,62 @@
+from typing import List
+
+from .compliance import auto_fix_elements
+from .schemas import LayoutElement
+
+
+def _scale_factors(src_w: int, src_h: int, dst_w: int, dst_h: int, scaling: str):
+    sx, sy = dst_w / src_w, dst_h / src_h
+    if scaling == "stretch":
+        return sx, sy
+    s = max(sx, sy) if scaling == "fill" else min(sx, sy)
+    return s, s
+
+
+def retarget_elements(elements: List[LayoutElement], src_w: int, src_h: int,
+                      dst_w: int, dst_h: int, scaling: str = "fit", reflow: bool = True) -> List[LayoutElement]:
+    """
+    Map a layout designed for src_w x src_h onto a dst_w x dst_h canvas.
+
+    scaling: "fit" scales uniformly so the whole layout fits (letterbox),
+             "fill" scales uniformly to cover the canvas (crops),
+             "stretch" scales each axis independently.
+    reflow:  without it the layout is transformed as one rigid block and
+             centred. With it, elements keep their uniform size but their
+             centres move proportionally across the new canvas, then get
+             clamped inside it and pushed out of safe zones, which suits
+             going from square to 9:16 or 1.91:1 much better.
+    """
+    fx, fy = _scale_factors(src_w, src_h, dst_w, dst_h, scaling)
+    font_scale = min(fx, fy)
+    # Rigid transform offsets (letterbox / crop centring)
+    ox = (dst_w - src_w * fx) / 2
+    oy = (dst_h - src_h * fy) / 2
+
+    out = []
+    for el in elements:
+        new_el = el.model_copy()
+        new_el.width = el.width * fx
+        new_el.height = el.height * fy
+        if el.font_size:
+            new_el.font_size = max(1, round(el.font_size * font_scale))
+
+        if reflow:
+            # Keep the element's centre at the same relative position
+            cx = (el.x + el.width / 2) / src_w * dst_w
+            cy = (el.y + el.height / 2) / src_h * dst_h
+            new_el.x = cx - new_el.width / 2
+            new_el.y = cy - new_el.height / 2
+            # Clamp inside the canvas when it fits
+            if new_el.width <= dst_w:
+                new_el.x = min(max(new_el.x, 0), dst_w - new_el.width)
+            if new_el.height <= dst_h:
+                new_el.y = min(max(new_el.y, 0), dst_h - new_el.height)
+        else:
+            new_el.x = el.x * fx + ox
+            new_el.y = el.y * fy + oy
+        out.append(new_el)
+
+    if reflow:
+        # Safe zones / minimum font size for the target placement
+        out = auto_fix_elements(out, dst_w, dst_h)
+    return out
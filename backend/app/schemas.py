@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Literal
+from typing import Any, Dict, List, Optional, Literal
 from datetime import date
 
 class Packshot(BaseModel):
@@ -7,11 +7,20 @@ class Packshot(BaseModel):
     url: str
     width: int
     height: int
+    format: Optional[str] = None # e.g. "PNG", "JPEG" - from the file header
+    size_bytes: Optional[int] = None
+    sha256: Optional[str] = None
+    thumbnail_url: Optional[str] = None # /variants URL for a 320px preview
 
 class LayoutRequest(BaseModel):
     packshot_id: str
-    width: int
-    height: int
+    width: int = Field(gt=0)
+    height: int = Field(gt=0)
+    # Element set for generated layouts
+    headline: str = "Big Headline"
+    subhead: Optional[str] = "Subheading"
+    value_tile: Optional[Literal["New", "White", "Clubcard"]] = None
+    count: int = Field(3, ge=1, le=10)
 
 class LayoutElement(BaseModel):
     type: Literal["packshot", "text", "shape", "image", "logo"] # Added logo
@@ -40,6 +49,7 @@ class LayoutProposal(BaseModel):
     canvas_width: int
     canvas_height: int
     elements: List[LayoutElement]
+    score: Optional[float] = None
 
 class ComplianceCheck(BaseModel):
     check_name: str
@@ -51,13 +61,93 @@ class ValidationReport(BaseModel):
     overall_pass: bool
     checks: List[ComplianceCheck]
 
+class ValidationRequest(BaseModel):
+    width: int
+    height: int
+    elements: List[LayoutElement]
+
+class BatchValidationRequest(BaseModel):
+    layouts: List[ValidationRequest]
+
+class ElementDelta(BaseModel):
+    op: Literal["add", "move", "edit", "delete"]
+    id: str
+    element: Optional[LayoutElement] = None # add
+    x: Optional[float] = None # move
+    y: Optional[float] = None
+    fields: Optional[Dict[str, Any]] = None # edit: partial element, e.g. {"text": "..."}
+
+class ValidationDeltaRequest(BaseModel):
+    base_revision: int
+    deltas: List[ElementDelta]
+
+class ValidationSessionResponse(BaseModel):
+    session_id: str
+    revision: int
+    report: ValidationReport
+
+class ValidationDeltaResponse(BaseModel):
+    session_id: str
+    revision: int
+    overall_pass: bool
+    changed: List[ComplianceCheck] # only checks whose result differs from the previous revision
+
 class ExportRequest(BaseModel):
-    canvas_width: int
-    canvas_height: int
+    canvas_width: int = Field(gt=0)
+    canvas_height: int = Field(gt=0)
     elements: List[LayoutElement]
     background_color: Optional[str] = "#ffffff"
     format: Literal["png", "jpg"] = "jpg"
+    max_kb: Optional[int] = None # Size budget, defaults to EXPORT_MAX_KB (500)
 
 class ExportResponse(BaseModel):
     url: str
     size_kb: float
+    format: Optional[str] = None
+    quality: Optional[int] = None # JPEG quality picked by the size search
+    colors: Optional[int] = None # PNG palette size, if quantized
+    encode_passes: Optional[int] = None
+    cached: bool = False # Served from the render cache without re-rendering
+    thumbnail_url: Optional[str] = None
+    file_size_check: Optional[ComplianceCheck] = None
+
+class ExportJobStatus(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    result: Optional[ExportResponse] = None
+    error: Optional[str] = None
+    # Per-job timing (ms): waiting for a worker, drawing, encoding + write, end to end
+    queue_ms: Optional[float] = None
+    render_ms: Optional[float] = None
+    encode_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+
+class ExportTarget(BaseModel):
+    width: int = Field(gt=0)
+    height: int = Field(gt=0)
+    name: Optional[str] = None # e.g. "story", "feed_square"
+
+class BatchExportRequest(BaseModel):
+    # Source layout, as designed in the editor
+    canvas_width: int = Field(gt=0)
+    canvas_height: int = Field(gt=0)
+    elements: List[LayoutElement]
+    background_color: Optional[str] = "#ffffff"
+    format: Literal["png", "jpg"] = "jpg"
+    max_kb: Optional[int] = None
+    targets: List[ExportTarget]
+    scaling: Literal["fit", "fill", "stretch"] = "fit"
+    reflow: bool = True
+
+class BatchExportItem(BaseModel):
+    name: Optional[str] = None
+    width: int
+    height: int
+    job_id: str
+    result: Optional[ExportResponse] = None
+    error: Optional[str] = None
+    render_ms: Optional[float] = None
+
+class BatchExportResponse(BaseModel):
+    items: List[BatchExportItem]
+    total_ms: float
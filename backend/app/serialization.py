@@ -0,0 +1,77 @@
+import json
+from typing import Any
+
+from starlette.responses import Response
+
+from .utils import parse_accept
+
+# Both are optional: without orjson the stdlib encoder is used, without
+# msgpack clients asking for it get JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+class UnsupportedBody(ValueError):
+    pass
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data) -> Any:
+    """Parse JSON bytes/str. Raises ValueError on malformed input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def is_msgpack(media_type: str) -> bool:
+    return (media_type or "").split(";")[0].strip().lower() in MSGPACK_MEDIA_TYPES
+
+
+def decode_body(body: bytes, content_type: str) -> Any:
+    """Request body as plain Python data: MessagePack if declared (and installed), else JSON."""
+    if is_msgpack(content_type):
+        if msgpack is None:
+            raise UnsupportedBody("MessagePack bodies need the msgpack package on the server")
+        try:
+            return msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack body: {e}")
+    try:
+        return loads(body)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON body: {e}")
+
+
+def negotiate(accept: str) -> str:
+    """
+    MessagePack if the client lists it with q > 0, at least as high as
+    JSON's, and we can produce it; else JSON. Wildcards only count for JSON.
+    """
+    if msgpack is None:
+        return JSON_MEDIA_TYPE
+    ranges = parse_accept(accept)
+    binary_q = max((ranges.get(t, 0.0) for t in MSGPACK_MEDIA_TYPES), default=0.0)
+    json_q = next((ranges[t] for t in (JSON_MEDIA_TYPE, "application/*", "*/*") if t in ranges), 0.0)
+    return MSGPACK_MEDIA_TYPE if binary_q > 0 and binary_q >= json_q else JSON_MEDIA_TYPE
+
+
+def encode_response(content: Any, accept: str, status_code: int = 200) -> Response:
+    """Encode plain data (dicts/lists, not models) in the format picked from `accept`."""
+    media_type = negotiate(accept)
+    body = msgpack.packb(content, use_bin_type=True) if media_type == MSGPACK_MEDIA_TYPE else dumps(content)
+    return Response(body, status_code=status_code, media_type=media_type, headers={"Vary": "Accept"})
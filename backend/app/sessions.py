@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .compliance import (check_dimensions, copy_result, get_copy_rules, is_9_16_canvas, packshot_count_result,
+                         safe_zone_messages, safe_zones_result, canvas_bounds_message, canvas_bounds_result,
+                         check_overlaps, SAFE_ZONE_BOTTOM)
+from .geometry import Box, SpatialIndex, element_bbox, element_height
+from .schemas import ComplianceCheck, ElementDelta, LayoutElement, ValidationReport
+
+MAX_SESSIONS = int(os.environ.get("CREATIVEOS_MAX_VALIDATION_SESSIONS", 1000))
+SESSION_IDLE_SECONDS = int(os.environ.get("CREATIVEOS_VALIDATION_SESSION_TTL", 30 * 60))
+
+
+class UnknownSession(KeyError):
+    pass
+
+
+class RevisionConflict(Exception):
+    def __init__(self, expected: int, current: int):
+        super().__init__(f"Session is at revision {current}, delta was based on {expected}")
+        self.current = current
+
+
+class DeltaError(ValueError):
+    pass
+
+
+def _geometry_key(el: LayoutElement) -> Tuple:
+    # Everything the safe-zone rule reads (text is part of the message label;
+    # width and family change how it wraps)
+    return (el.type, el.y, el.width, el.height, el.font_size, el.font_family, el.text)
+
+
+def _copy_key(el: LayoutElement) -> Tuple:
+    return (el.type, el.text)
+
+
+def _box_key(el: LayoutElement) -> Tuple:
+    # Inputs to element_bbox plus what the overlap/bounds messages mention
+    return (el.type, el.x, el.y, el.width, el.height, el.font_size, el.font_family, el.text, el.tile_type)
+
+
+class ValidationSession:
+    """
+    Server-side copy of a layout being edited, with per-element rule results
+    cached by element content. Applying a delta only re-runs the element
+    rules whose inputs changed; layout-level checks are re-assembled from
+    the cached pieces and only checks that differ from the last response
+    are sent back.
+    """
+
+    def __init__(self, width: int, height: int, elements: List[LayoutElement]):
+        self.id = uuid.uuid4().hex
+        self.width = width
+        self.height = height
+        self.revision = 0
+        self.touched = time.monotonic()
+        self.lock = threading.Lock()
+        self.elements: "OrderedDict[str, LayoutElement]" = OrderedDict()
+        self._safe_zone: Dict[str, Tuple[Tuple, List[str]]] = {}
+        self._copy: Dict[str, Tuple[Tuple, List[str]]] = {}
+        self._copy_version: Optional[Tuple[str, str]] = None
+        self._boxes: Dict[str, Tuple[Tuple, Box]] = {}
+        self._bounds: Dict[str, Tuple[Tuple, Optional[str]]] = {}
+        self._overlap: Optional[Tuple[Tuple, ComplianceCheck]] = None
+        self._last: Dict[str, ComplianceCheck] = {}
+        for i, el in enumerate(elements):
+            el_id = el.id or f"el-{i}"
+            if el_id in self.elements:
+                raise DeltaError(f"Duplicate element id '{el_id}'")
+            self.elements[el_id] = el
+
+    # Per-element rules -------------------------------------------------
+
+    def _safe_zone_for(self, el_id: str, el: LayoutElement) -> List[str]:
+        key = _geometry_key(el)
+        cached = self._safe_zone.get(el_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        el_h = element_height(el)
+        messages = safe_zone_messages(el.text or el.type, el.y, el.y + el_h, self.height - SAFE_ZONE_BOTTOM)
+        self._safe_zone[el_id] = (key, messages)
+        return messages
+
+    def _copy_for(self, el_id: str, el: LayoutElement, rules) -> List[str]:
+        key = _copy_key(el)
+        cached = self._copy.get(el_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        found = []
+        if el.type == "text" and el.text:
+            found = [f"Forbidden: '{bad}' in '{el.text}'" for bad in rules.find(el.text)]
+        self._copy[el_id] = (key, found)
+        return found
+
+    def _box_for(self, el_id: str, el: LayoutElement) -> Box:
+        key = _box_key(el)
+        cached = self._boxes.get(el_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        box = element_bbox(el)
+        self._boxes[el_id] = (key, box)
+        return box
+
+    def _bounds_for(self, el_id: str, el: LayoutElement, box: Box) -> Optional[str]:
+        key = _box_key(el)
+        cached = self._bounds.get(el_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        msg = canvas_bounds_message(el, box, self.width, self.height)
+        self._bounds[el_id] = (key, msg)
+        return msg
+
+    def _overlaps(self, boxes: List[Box]) -> ComplianceCheck:
+        # Pairwise results depend on every element; rebuild the index only
+        # when some element's box (or label) actually changed
+        signature = tuple((el_id, self._boxes[el_id][0]) for el_id in self.elements)
+        if self._overlap is not None and self._overlap[0] == signature:
+            return self._overlap[1]
+        check = check_overlaps(list(self.elements.values()), SpatialIndex(boxes))
+        self._overlap = (signature, check)
+        return check
+
+    # Assembly ----------------------------------------------------------
+
+    def _checks(self) -> List[ComplianceCheck]:
+        rules = get_copy_rules()
+        # The digest catches edits that keep the file's version string
+        if (rules.version, rules.digest) != self._copy_version:
+            # Rule file changed since the last evaluation
+            self._copy.clear()
+            self._copy_version = (rules.version, rules.digest)
+
+        violations, found, packshots, boxes, outside = [], [], 0, [], []
+        check_zones = is_9_16_canvas(self.width, self.height)
+        for el_id, el in self.elements.items():
+            if check_zones:
+                violations.extend(self._safe_zone_for(el_id, el))
+            found.extend(self._copy_for(el_id, el, rules))
+            if el.type == "packshot":
+                packshots += 1
+            box = self._box_for(el_id, el)
+            boxes.append(box)
+            msg = self._bounds_for(el_id, el, box)
+            if msg:
+                outside.append(msg)
+        return [
+            check_dimensions(self.width, self.height),
+            safe_zones_result(violations),
+            copy_result(found),
+            packshot_count_result(packshots),
+            canvas_bounds_result(outside),
+            self._overlaps(boxes),
+        ]
+
+    def report(self) -> ValidationReport:
+        checks = self._checks()
+        self._last = {c.check_name: c for c in checks}
+        return ValidationReport(overall_pass=all(c.passed for c in checks), checks=checks)
+
+    # Deltas ------------------------------------------------------------
+
+    def _apply(self, delta: ElementDelta):
+        if delta.op == "add":
+            if delta.element is None:
+                raise DeltaError(f"'add' for '{delta.id}' needs an element")
+            if delta.id in self.elements:
+                raise DeltaError(f"Element '{delta.id}' already exists")
+            self.elements[delta.id] = delta.element
+            return
+        if delta.id not in self.elements:
+            raise DeltaError(f"Unknown element '{delta.id}'")
+        if delta.op == "delete":
+            del self.elements[delta.id]
+            for cache in (self._safe_zone, self._copy, self._boxes, self._bounds):
+                cache.pop(delta.id, None)
+        elif delta.op == "move":
+            changes = {k: v for k, v in (("x", delta.x), ("y", delta.y)) if v is not None}
+            self.elements[delta.id] = self.elements[delta.id].model_copy(update=changes)
+        elif delta.op == "edit":
+            # Re-validate so edited fields keep their types
+            merged = {**self.elements[delta.id].model_dump(), **(delta.fields or {})}
+            self.elements[delta.id] = LayoutElement(**merged)
+
+    def apply(self, base_revision: int, deltas: List[ElementDelta]) -> Tuple[bool, List[ComplianceCheck]]:
+        """Apply deltas atomically; returns (overall_pass, checks that changed)."""
+        if base_revision != self.revision:
+            raise RevisionConflict(base_revision, self.revision)
+        snapshot = OrderedDict(self.elements)
+        try:
+            for delta in deltas:
+                self._apply(delta)
+        except Exception:
+            self.elements = snapshot
+            raise
+        self.revision += 1
+
+        checks = self._checks()
+        changed = [c for c in checks if self._last.get(c.check_name) != c]
+        self._last = {c.check_name: c for c in checks}
+        return all(c.passed for c in checks), changed
+
+
+class ValidationSessionStore:
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_seconds: int = SESSION_IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, ValidationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, width: int, height: int, elements: List[LayoutElement]) -> ValidationSession:
+        session = ValidationSession(width, height, elements)
+        with self._lock:
+            self._sessions[session.id] = session
+            self._expire()
+        return session
+
+    def get(self, session_id: str) -> ValidationSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise UnknownSession(session_id)
+            session.touched = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def close(self, session_id: str):
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                raise UnknownSession(session_id)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) > self.max_sessions or oldest.touched < cutoff:
+                self._sessions.popitem(last=False)
+            else:
+                break
+
+
+validation_sessions = ValidationSessionStore()
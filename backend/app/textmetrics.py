@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .fonts import font_registry, _norm, DEFAULT_FAMILY
+
+TEXT_LAYOUT_CACHE_SIZE = int(os.environ.get("CREATIVEOS_TEXT_LAYOUT_CACHE_SIZE", 4096))
+DEFAULT_FONT_SIZE = 24
+# Wrapping slack so a box sized from a measurement still fits after rounding
+WRAP_TOLERANCE = 0.5
+
+
+class TextLayout(NamedTuple):
+    lines: Tuple[str, ...]
+    width: float
+    height: float
+    line_height: float
+
+
+class FontMetrics:
+    """
+    Advance widths and vertical metrics for one FreeType face. Glyph
+    advances are looked up once per character and reused, so measuring a
+    line is a sum of dict lookups instead of a FreeType layout call.
+    Kerning is ignored, which errs slightly wide.
+    """
+
+    def __init__(self, font):
+        self.font = font
+        ascent, descent = font.getmetrics()
+        self.ascent = ascent
+        self.line_height = ascent + descent
+        self._advances: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def advance(self, ch: str) -> float:
+        adv = self._advances.get(ch)
+        if adv is None:
+            adv = self.font.getlength(ch)
+            with self._lock:
+                self._advances[ch] = adv
+        return adv
+
+    def line_width(self, line: str) -> float:
+        advances = self._advances
+        total = 0.0
+        for ch in line:
+            adv = advances.get(ch)
+            total += adv if adv is not None else self.advance(ch)
+        return total
+
+
+class TextMeasurer:
+    """
+    Measures and wraps text without rasterizing it. Metrics are cached per
+    (family, size) alongside the registry's faces; finished layouts are
+    cached per (text, family, size, max_width) since the same strings are
+    measured by every validation pass.
+    """
+
+    def __init__(self, registry=font_registry, cache_size: int = TEXT_LAYOUT_CACHE_SIZE):
+        self.registry = registry
+        self.cache_size = cache_size
+        self._metrics: Dict[Tuple[str, int], FontMetrics] = {}
+        self._layouts: "OrderedDict[tuple, TextLayout]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def metrics(self, family: Optional[str], size: int) -> FontMetrics:
+        key = (_norm(family or DEFAULT_FAMILY), max(1, int(size)))
+        m = self._metrics.get(key)
+        if m is None:
+            m = FontMetrics(self.registry.get_font(family, key[1]))
+            with self._lock:
+                self._metrics[key] = m
+        return m
+
+    def measure(self, text: str, family: Optional[str], size: Optional[int], max_width: Optional[float] = None) -> TextLayout:
+        """Lines, overall width/height and line pitch for `text`, wrapped to `max_width` if given."""
+        size = size or DEFAULT_FONT_SIZE
+        key = (text, _norm(family or DEFAULT_FAMILY), size, max_width or None)
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+                self.hits += 1
+                return layout
+        self.misses += 1
+        m = self.metrics(family, size)
+        lines: List[str] = []
+        for paragraph in text.split("\n"):
+            lines.extend(self._wrap(paragraph, m, max_width) if max_width else [paragraph])
+        width = max((m.line_width(line) for line in lines), default=0.0)
+        layout = TextLayout(tuple(lines), width, len(lines) * m.line_height, m.line_height)
+        with self._lock:
+            self._layouts[key] = layout
+            while len(self._layouts) > self.cache_size:
+                self._layouts.popitem(last=False)
+        return layout
+
+    @staticmethod
+    def _wrap(paragraph: str, m: FontMetrics, max_width: float) -> List[str]:
+        """Greedy word wrap; words wider than the box are broken between characters."""
+        limit = max_width + WRAP_TOLERANCE
+        words = paragraph.split(" ")
+        space = m.advance(" ")
+        lines, current, current_w = [], "", 0.0
+        for word in words:
+            word_w = m.line_width(word)
+            if current and current_w + space + word_w <= limit:
+                current, current_w = current + " " + word, current_w + space + word_w
+                continue
+            if current:
+                lines.append(current)
+            current, current_w = word, word_w
+            # Break an over-long word into pieces that fit
+            while current_w > limit and len(current) > 1:
+                cut, w = 0, 0.0
+                while cut < len(current) and w + m.advance(current[cut]) <= limit:
+                    w += m.advance(current[cut])
+                    cut += 1
+                cut = max(cut, 1)
+                lines.append(current[:cut])
+                current = current[cut:]
+                current_w = m.line_width(current)
+        lines.append(current)
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+            self._layouts.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "fonts": len(self._metrics),
+            "layouts": len(self._layouts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+text_measurer = TextMeasurer()
+
+
+def measure_text(text: str, family: Optional[str], size: Optional[int], max_width: Optional[float] = None) -> TextLayout:
+    return text_measurer.measure(text, family, size, max_width)
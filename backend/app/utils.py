@@ -1,18 +1,133 @@
+import hashlib
 import os
+import threading
 import uuid
+from collections import OrderedDict
 from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 UPLOAD_DIR = BASE_DIR / "uploads"
 EXPORT_DIR = BASE_DIR / "exports"
+CACHE_DIR = BASE_DIR / "cache"
+
+UPLOAD_MAX_MB = int(os.environ.get("CREATIVEOS_UPLOAD_MAX_MB", 25))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Entries per in-memory hash memo; a miss just re-reads the file
+HASH_CACHE_SIZE = int(os.environ.get("CREATIVEOS_HASH_CACHE_SIZE", 4096))
+
+class LRUDict:
+    """Small thread-safe mapping that drops its least recently used entries past `maxsize`."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+# sha256 per (path, mtime_ns, size). Keyed by content version, not name, so
+# files rewritten under the same name (nobg_ cutouts) never get a stale hash.
+# Uploads are seeded while they stream in, so remove-bg lookups don't re-read them.
+_content_hashes = LRUDict(HASH_CACHE_SIZE)
+
+class UploadTooLarge(Exception):
+    pass
 
 def get_unique_filename(filename: str) -> str:
     ext = filename.split(".")[-1]
     return f"{uuid.uuid4()}.{ext}"
 
-def save_upload(file_contents: bytes, filename: str) -> str:
+async def save_upload_stream(upload, filename: str, max_bytes: int = UPLOAD_MAX_MB * 1024 * 1024) -> Tuple[str, int, str]:
+    """
+    Copy an UploadFile to UPLOAD_DIR chunk by chunk, hashing as it goes.
+    File writes run in the threadpool so the event loop never blocks on disk.
+    Raises UploadTooLarge (and removes the partial file) past `max_bytes`.
+    Returns (unique_name, size_bytes, sha256).
+    """
     unique_name = get_unique_filename(filename)
     path = UPLOAD_DIR / unique_name
-    with open(path, "wb") as f:
-        f.write(file_contents)
-    return str(unique_name) # Return filename (served statically)
+    h = hashlib.sha256()
+    size = 0
+    f = await run_in_threadpool(open, path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes // (1024 * 1024)}MB limit")
+            h.update(chunk)
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        f.close()
+        path.unlink(missing_ok=True)
+        raise
+    f.close()
+    digest = h.hexdigest()
+    st = os.stat(path)
+    _content_hashes[(str(path), st.st_mtime_ns, st.st_size)] = digest
+    return unique_name, size, digest
+
+def parse_accept(header: Optional[str]) -> Dict[str, float]:
+    """Media ranges of an Accept header mapped to their q-values (q=0 means refused)."""
+    ranges = {}
+    for part in (header or "").split(","):
+        media, _, params = part.partition(";")
+        media = media.strip().lower()
+        if not media:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges[media] = q
+    return ranges
+
+def read_image_meta(path) -> Optional[Tuple[int, int, str]]:
+    """(width, height, format) from the image header only - no pixel decode."""
+    try:
+        with Image.open(path) as img:
+            return img.width, img.height, img.format
+    except Exception:
+        return None
+
+def content_sha256(path) -> str:
+    st = os.stat(path)
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    digest = _content_hashes.get(key)
+    if digest is None:
+        digest = file_sha256(path)
+        _content_hashes[key] = digest
+    return digest
+
+def file_sha256(path, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
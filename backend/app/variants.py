@@ -0,0 +1,220 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from PIL import Image, features
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+
+from .cache import DiskLRUCache, make_key
+from .utils import CACHE_DIR, UPLOAD_DIR, EXPORT_DIR, content_sha256, parse_accept
+
+VARIANTS_DIR = CACHE_DIR / "variants"
+# Variants of replaced or evicted sources are never requested again and age out
+VARIANTS_MAX_MB = int(os.environ.get("CREATIVEOS_VARIANTS_MB", 1024))
+# Widths generated up front; requests snap up to the nearest one
+VARIANT_WIDTHS = tuple(int(w) for w in os.environ.get("CREATIVEOS_VARIANT_WIDTHS", "160,320,640,1280").split(","))
+VARIANT_QUALITY = 80
+# Compact formats generated in the background, best first
+BACKGROUND_FORMATS = [f for f in ("avif", "webp") if features.check(f)]
+FORMATS = {"avif": "image/avif", "webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+SOURCE_DIRS = {"uploads": UPLOAD_DIR, "exports": EXPORT_DIR}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# nobg_ cutouts keep a fixed name but get new bytes when background removal
+# is re-run (cache invalidated, model or options changed), so revalidate them
+REVALIDATE = "no-cache"
+
+
+def cache_control_for(filename: str) -> str:
+    return REVALIDATE if filename.startswith("nobg_") else IMMUTABLE
+
+
+def available_formats() -> List[str]:
+    return [f for f in FORMATS if f in ("jpg", "png") or features.check(f)]
+
+
+def snap_width(width: int) -> int:
+    for w in VARIANT_WIDTHS:
+        if w >= width:
+            return w
+    return VARIANT_WIDTHS[-1]
+
+
+def source_path(kind: str, filename: str) -> Optional[Path]:
+    base = SOURCE_DIRS.get(kind)
+    if base is None or Path(filename).name != filename:
+        return None
+    path = base / filename
+    return path if path.is_file() else None
+
+
+_variant_cache: Optional[DiskLRUCache] = None
+
+
+def get_variant_cache() -> DiskLRUCache:
+    global _variant_cache
+    if _variant_cache is None:
+        _variant_cache = DiskLRUCache(VARIANTS_DIR, max_bytes=VARIANTS_MAX_MB * 1024 * 1024,
+                                      fingerprint=f"variants-q{VARIANT_QUALITY}")
+    return _variant_cache
+
+
+def variant_key(kind: str, filename: str, width: int, fmt: str, source: Path) -> str:
+    # mtime in the key: a rewritten source never serves old variants
+    version = str(source.stat().st_mtime_ns)
+    return f"{make_key(kind, filename, version)[:40]}_w{width}.{fmt}"
+
+
+def _save(img: Image.Image, cache: DiskLRUCache, key: str, fmt: str) -> Path:
+    tmp = cache.directory / f".{key}.{threading.get_ident()}.tmp"
+    if fmt == "jpg":
+        img.convert("RGB").save(tmp, "JPEG", quality=VARIANT_QUALITY, optimize=True)
+    elif fmt == "png":
+        img.save(tmp, "PNG", optimize=True)
+    elif fmt == "webp":
+        img.save(tmp, "WEBP", quality=VARIANT_QUALITY, method=4)
+    else:
+        img.save(tmp, "AVIF", quality=VARIANT_QUALITY - 20)
+    try:
+        return cache.put_file(key, tmp)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _thumbnail(source: Path, width: int) -> Image.Image:
+    with Image.open(source) as f:
+        height = max(1, round(f.height * width / f.width))
+        if f.width > width:
+            f.draft("RGB", (width, height))  # JPEG: decode at reduced scale
+        img = f if f.mode in ("RGB", "RGBA") else f.convert("RGBA")
+        return img.resize((width, height), Image.Resampling.LANCZOS) if img.width > width else img.copy()
+
+
+def generate_variants(kind: str, filename: str, widths=VARIANT_WIDTHS, formats=None) -> List[Path]:
+    """Write every missing (width, format) variant of one file. Returns the paths."""
+    source = source_path(kind, filename)
+    if source is None:
+        return []
+    formats = formats or BACKGROUND_FORMATS
+    cache = get_variant_cache()
+    with Image.open(source) as f:
+        src_width = f.width
+    written = []
+    # Largest first, each next size resized from the previous one
+    img = None
+    for width in sorted({min(w, src_width) for w in widths}, reverse=True):
+        todo = [fmt for fmt in formats if cache.get(variant_key(kind, filename, width, fmt, source)) is None]
+        if not todo:
+            continue
+        if img is None:
+            img = _thumbnail(source, width)
+        elif img.width != width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.Resampling.LANCZOS)
+        for fmt in todo:
+            written.append(_save(img, cache, variant_key(kind, filename, width, fmt, source), fmt))
+    return written
+
+
+def get_variant(kind: str, filename: str, width: int, fmt: str) -> Optional[Path]:
+    """Path of one variant, generating it now if the background job hasn't yet. None if unavailable."""
+    source = source_path(kind, filename)
+    if source is None:
+        return None
+    with Image.open(source) as f:
+        width = min(snap_width(width), f.width)
+    key = variant_key(kind, filename, width, fmt, source)
+    path = get_variant_cache().get(key)
+    if path is None:
+        generate_variants(kind, filename, widths=(width,), formats=[fmt])
+        path = get_variant_cache().get(key)
+    return path
+
+
+def discard_variants(kind: str, filename: str):
+    """Delete every cached variant of the file's current version."""
+    source = source_path(kind, filename)
+    if source is None:
+        return
+    with Image.open(source) as f:
+        src_width = f.width
+    cache = get_variant_cache()
+    for width in {min(w, src_width) for w in VARIANT_WIDTHS}:
+        for fmt in FORMATS:
+            cache.discard(variant_key(kind, filename, width, fmt, source))
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_scheduled = set()
+_scheduled_lock = threading.Lock()
+
+
+def _run_scheduled(kind: str, filename: str):
+    try:
+        generate_variants(kind, filename)
+    except FileNotFoundError:
+        pass  # source evicted or deleted before the job got to it
+    except Exception as e:
+        print(f"Variant generation failed for {kind}/{filename}: {e}")
+    finally:
+        with _scheduled_lock:
+            _scheduled.discard((kind, filename))
+
+
+def schedule_variants(kind: str, filename: str):
+    """Queue background generation of all variants for a new file (deduped)."""
+    with _scheduled_lock:
+        if (kind, filename) in _scheduled:
+            return
+        _scheduled.add((kind, filename))
+        global _executor
+        if _executor is None:
+            # Started lazily (and again after shutdown), like the worker pools
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="variants")
+        executor = _executor
+    executor.submit(_run_scheduled, kind, filename)
+
+
+def shutdown(wait: bool = False):
+    global _executor
+    with _scheduled_lock:
+        executor, _executor = _executor, None
+        _scheduled.clear()
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def negotiate_format(accept: str, source: Path) -> str:
+    """
+    Compact format the client explicitly accepts with the highest q (ties go
+    to our preference order), else the source's own format. Wildcards don't
+    count: `*/*` clients may not decode AVIF.
+    """
+    ranges = parse_accept(accept)
+    accepted = [fmt for fmt in BACKGROUND_FORMATS if ranges.get(FORMATS[fmt], 0) > 0]
+    if accepted:
+        return max(accepted, key=lambda fmt: ranges[FORMATS[fmt]])
+    return "png" if source.suffix.lower() == ".png" else "jpg"
+
+
+def immutable_file_response(path: Path, media_type: str, if_none_match: Optional[str],
+                            cache_control: str = IMMUTABLE, vary: Optional[str] = None) -> Response:
+    """FileResponse with a strong content-hash ETag; 304 when the client has it."""
+    etag = f'"{content_sha256(path)[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles whose responses carry long-lived cache headers, except for nobg_ cutouts."""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = cache_control_for(os.path.basename(full_path))
+        return response
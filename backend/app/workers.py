@@ -0,0 +1,123 @@
+import asyncio
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+from .ai import REMBG_MODEL, get_rembg_session
+
+# Each rembg worker holds a full ONNX session in memory (~200MB for u2net),
+# so keep the default small and let deployments scale it up.
+REMBG_WORKERS = int(os.environ.get("CREATIVEOS_REMBG_WORKERS", min(2, os.cpu_count() or 1)))
+REMBG_MAX_PENDING = int(os.environ.get("CREATIVEOS_REMBG_MAX_PENDING", REMBG_WORKERS * 4))
+
+
+class PoolBusy(Exception):
+    """Raised when a pool already has `max_pending` jobs queued or running."""
+
+
+class WorkerPool:
+    """
+    A process pool with a bounded job queue.
+
+    CPU-bound work (model inference, image encoding) runs in worker processes
+    so the event loop stays free. `run()` refuses new work with `PoolBusy`
+    once `max_pending` jobs are in flight instead of queueing without limit.
+    The executor is created lazily so importing the app never forks.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int,
+                 initializer: Optional[Callable] = None, initargs: Tuple = ()):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=self._initializer,
+                initargs=self._initargs,
+            )
+        return self._executor
+
+    def reserve(self):
+        """Claim a queue slot without submitting yet. Pair with `release()`."""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolBusy(f"{self.name} pool is full ({self._pending}/{self.max_pending} jobs pending)")
+        self._pending += 1
+
+    def release(self):
+        self._pending -= 1
+
+    async def run_reserved(self, fn: Callable, *args, on_submit: Optional[Callable[[Future], None]] = None) -> Any:
+        """
+        Run `fn(*args)` in a worker using a slot already taken with `reserve()`.
+        `on_submit` receives the executor future, e.g. to poll `running()`.
+        """
+        try:
+            future = self._get_executor().submit(fn, *args)
+            if on_submit is not None:
+                on_submit(future)
+            result = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault in a native lib). Drop the executor so
+            # the next job gets a fresh pool instead of failing forever.
+            self.failed += 1
+            self._executor = None
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.release()
+        self.completed += 1
+        return result
+
+    async def run(self, fn: Callable, *args) -> Any:
+        self.reserve()
+        return await self.run_reserved(fn, *args)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+def _init_rembg_worker(model_name: str):
+    # Preload the session so the first job in each worker doesn't pay for it
+    try:
+        get_rembg_session(model_name)
+    except Exception as e:
+        print(f"Rembg worker could not preload '{model_name}': {e}")
+
+
+rembg_pool = WorkerPool(
+    "remove-bg",
+    max_workers=REMBG_WORKERS,
+    max_pending=REMBG_MAX_PENDING,
+    initializer=_init_rembg_worker,
+    initargs=(REMBG_MODEL,),
+)
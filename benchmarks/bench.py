@@ -0,0 +1,312 @@
+"""
+Offline benchmark for the CreativeOS backend.
+
+Drives the FastAPI app in-process (TestClient, no server needed) with the
+images in sample_assets/ plus generated layouts, and times every endpoint
+at several canvas sizes and element counts. Writes p50/p95/throughput and
+peak RSS per case to JSON and, when a baseline exists, fails (exit 1) if a
+case got slower than the baseline by more than the tolerance.
+
+    python benchmarks/bench.py                      # full run, compare to baseline
+    python benchmarks/bench.py --quick              # fewer iterations
+    python benchmarks/bench.py --stages validate,export
+    python benchmarks/bench.py --update-baseline    # record this machine's numbers
+
+Baselines are machine-specific and not committed (benchmarks/baseline.json
+is gitignored): record one with --update-baseline on the machine that runs
+the comparison.
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "backend"))
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import variants
+from app.main import app
+from app.cache import export_filename, export_render_key, get_export_cache, get_rembg_cache, rembg_cache_key
+from app.layout_engine import clear_layout_cache
+from app.schemas import ExportRequest
+from app.utils import UPLOAD_DIR
+
+ASSETS_DIR = ROOT / "sample_assets"
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_OUT = BENCH_DIR / "results.json"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+STAGES = ["upload", "remove-bg", "suggest-layouts", "validate", "auto-fix", "export"]
+CANVASES = [(1080, 1080), (1080, 1920), (1200, 628)]
+ELEMENT_COUNTS = [5, 50, 500]
+# Synthetic uploads on top of the sample assets (edge px, format)
+SYNTHETIC_UPLOADS = [(512, "JPEG"), (2048, "JPEG"), (2048, "PNG")]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+
+class Bench:
+    def __init__(self, client, iterations, warmup=1):
+        self.client = client
+        self.iterations = iterations
+        self.warmup = warmup
+        self.results = {}
+        # Everything the run writes, so cleanup() can remove it again
+        self.uploaded = {}  # id -> sha256
+        self.rembg_keys = set()
+        self.exports = {}  # render key -> filename
+
+    def case(self, name, fn, iterations=None):
+        """Time `fn` (one request per call) and record latency stats under `name`."""
+        n = iterations or self.iterations
+        for _ in range(self.warmup):
+            fn()
+        # Don't bill this case for garbage left by the previous one
+        gc.collect()
+        times = []
+        started = time.perf_counter()
+        for _ in range(n):
+            t = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - t) * 1000)
+        wall = time.perf_counter() - started
+        self.results[name] = {
+            "n": n,
+            "p50_ms": round(percentile(times, 50), 3),
+            "p95_ms": round(percentile(times, 95), 3),
+            "mean_ms": round(sum(times) / n, 3),
+            "throughput_rps": round(n / wall, 2) if wall else None,
+        }
+        print(f"  {name:<48} p50 {self.results[name]['p50_ms']:>9.2f}ms  p95 {self.results[name]['p95_ms']:>9.2f}ms")
+
+    def post(self, path, **kwargs):
+        r = self.client.post(path, **kwargs)
+        if r.status_code >= 400:
+            raise RuntimeError(f"{path} -> {r.status_code}: {r.text[:200]}")
+        return r.json()
+
+    def upload(self, name, data, content_type):
+        body = self.post("/upload", files={"file": (name, data, content_type)})
+        self.uploaded[body["id"]] = body["sha256"]
+        return body
+
+    def remove_bg(self, packshot_id):
+        body = self.post("/remove-bg", params={"packshot_id": packshot_id})
+        if body.get("cached") is False:
+            # Only entries this run created; sample assets may already be cached
+            self.rembg_keys.add(rembg_cache_key(self.uploaded[packshot_id]))
+        return body
+
+    def track_export(self, req):
+        model = ExportRequest.model_validate(req)
+        key = export_render_key(model)
+        self.exports[key] = export_filename(key, model)
+        return key
+
+    def cleanup(self):
+        # Stop background variant generation before deleting what it reads
+        variants.shutdown(wait=True)
+        for key, filename in self.exports.items():
+            variants.discard_variants("exports", filename)
+            get_export_cache().discard(key)
+        for name in self.uploaded:
+            for filename in (name, f"nobg_{os.path.splitext(name)[0]}.png"):
+                variants.discard_variants("uploads", filename)
+                (UPLOAD_DIR / filename).unlink(missing_ok=True)
+        for key in self.rembg_keys:
+            get_rembg_cache().discard(key)
+
+
+def synthetic_image(edge, fmt):
+    rng = random.Random(edge)
+    img = Image.new("RGB", (edge, edge), (240, 240, 240))
+    # Blocky noise: compresses like a photo rather than a flat fill
+    block = Image.frombytes("RGB", (edge // 8, edge // 8), rng.randbytes(3 * (edge // 8) ** 2))
+    img.paste(block.resize((edge, edge), Image.NEAREST))
+    buf = io.BytesIO()
+    img.save(buf, fmt)
+    return buf.getvalue()
+
+
+def random_layout(rng, width, height, count, packshot_id):
+    elements = [{"type": "packshot", "x": width * 0.1, "y": height * 0.3, "width": width * 0.4,
+                 "height": width * 0.4, "text": packshot_id, "z_index": 1}]
+    words = ["Fresh", "Crunchy", "New", "Taste", "Only at Tesco", "Great value", "Family size"]
+    for i in range(count - 1):
+        if i % 5 == 4:
+            elements.append({"type": "shape", "x": rng.uniform(0, width * 0.9), "y": rng.uniform(0, height * 0.9),
+                             "width": rng.uniform(20, 200), "height": rng.uniform(20, 200), "color": "#f0f0f0"})
+        else:
+            elements.append({"type": "text", "x": rng.uniform(0, width * 0.8), "y": rng.uniform(0, height * 0.95),
+                             "text": " ".join(rng.sample(words, 2)), "font_size": rng.choice([24, 36, 48, 64]),
+                             "font_family": "Arial", "color": "#000000", "z_index": 2})
+    return elements
+
+
+def run(stages, iterations):
+    rng = random.Random(1234)
+    with TestClient(app) as client:
+        bench = Bench(client, iterations)
+        try:
+            assets = sorted(ASSETS_DIR.glob("*.png"))
+            packshots = [bench.upload(p.name, p.read_bytes(), "image/png") for p in assets]
+            # Layouts reference the asset by URL, as the editor does, so exports really draw it
+            packshot = packshots[0]["url"]
+
+            if "upload" in stages:
+                print("upload")
+                for p in assets:
+                    data = p.read_bytes()
+                    bench.case(f"upload/{p.stem}", lambda d=data, n=p.name: bench.upload(n, d, "image/png"))
+                for edge, fmt in SYNTHETIC_UPLOADS:
+                    data = synthetic_image(edge, fmt)
+                    ext = "jpg" if fmt == "JPEG" else "png"
+                    bench.case(f"upload/synthetic_{edge}.{ext}",
+                               lambda d=data, e=ext: bench.upload(f"bench.{e}", d, f"image/{e}"))
+
+            if "remove-bg" in stages:
+                print("remove-bg")
+                # First call per image is inference (or the fallback); repeats hit the cache
+                for asset, p in zip(assets, packshots):
+                    bench.case(f"remove-bg/{asset.stem}",
+                               lambda pid=p["id"]: bench.remove_bg(pid),
+                               iterations=max(2, iterations // 5))
+
+            if "suggest-layouts" in stages:
+                print("suggest-layouts")
+                for w, h in CANVASES:
+                    req = {"packshot_id": packshot, "width": w, "height": h, "value_tile": "New"}
+
+                    def cold(req=req):
+                        clear_layout_cache()
+                        bench.post("/suggest-layouts", json=req)
+                    bench.case(f"suggest-layouts/cold/{w}x{h}", cold)
+                    bench.case(f"suggest-layouts/warm/{w}x{h}", lambda req=req: bench.post("/suggest-layouts", json=req))
+
+            layouts = {(w, h, n): random_layout(rng, w, h, n, packshot)
+                       for w, h in CANVASES for n in ELEMENT_COUNTS}
+
+            for stage, path in (("validate", "/validate"), ("auto-fix", "/auto-fix")):
+                if stage in stages:
+                    print(stage)
+                    for (w, h, n), elements in layouts.items():
+                        req = {"width": w, "height": h, "elements": elements}
+                        bench.case(f"{stage}/{w}x{h}/{n}el", lambda req=req, path=path: bench.post(path, json=req))
+
+            if "validate" in stages:
+                batch = [{"width": w, "height": h, "elements": els} for (w, h, n), els in layouts.items() if n <= 50] * 20
+                bench.case(f"validate/batch/{len(batch)}layouts",
+                           lambda: bench.client.post("/validate/batch", json={"layouts": batch}).content)
+
+            if "export" in stages:
+                print("export")
+                for w, h in CANVASES:
+                    proposal = bench.post("/suggest-layouts", json={"packshot_id": packshot, "width": w, "height": h})[0]
+                    for fmt in ("jpg", "png"):
+                        req = {"canvas_width": w, "canvas_height": h, "elements": proposal["elements"], "format": fmt}
+                        key = bench.track_export(req)
+
+                        def cold(req=req, key=key):
+                            # Identical requests are deduplicated; drop the result to force a render
+                            get_export_cache().discard(key)
+                            bench.post("/export", json=req)
+                        bench.case(f"export/cold/{w}x{h}/{fmt}", cold, iterations=max(3, iterations // 4))
+                        bench.case(f"export/warm/{w}x{h}/{fmt}", lambda req=req: bench.post("/export", json=req),
+                                   iterations=max(3, iterations // 4))
+        finally:
+            bench.cleanup()
+    return bench.results
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    """Cases whose p50 regressed past baseline * (1 + tolerance) + slack."""
+    regressions = []
+    for name, base in baseline.get("cases", {}).items():
+        current = results["cases"].get(name)
+        if current is None:
+            continue
+        limit = base["p50_ms"] * (1 + tolerance) + slack_ms
+        if current["p50_ms"] > limit:
+            regressions.append(f"{name}: p50 {current['p50_ms']:.2f}ms > {limit:.2f}ms (baseline {base['p50_ms']:.2f}ms)")
+    base_rss = baseline.get("peak_rss_mb", {}).get("self")
+    if base_rss and results["peak_rss_mb"]["self"] > base_rss * (1 + tolerance):
+        regressions.append(f"peak RSS {results['peak_rss_mb']['self']}MB > {base_rss * (1 + tolerance):.1f}MB (baseline {base_rss}MB)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="5 iterations per case instead of 30")
+    parser.add_argument("--iterations", type=int, help="iterations per case")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of: " + ", ".join(STAGES))
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative p50 slowdown (0.5 = 50%%)")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="absolute slack so sub-ms cases don't flap")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    iterations = args.iterations or (5 if args.quick else 30)
+
+    cases = run(stages, iterations)
+    own, children = peak_rss_mb()
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "iterations": iterations,
+        "peak_rss_mb": {"self": own, "workers": children},
+        "cases": cases,
+    }
+    args.out.write_text(json.dumps(results, indent=2))
+    print(f"\nPeak RSS {own}MB (workers {children}MB). Results written to {args.out}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print("No baseline to compare against (run with --update-baseline)")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("machine") != results["machine"]:
+        print(f"Warning: baseline was recorded on a different machine ({baseline.get('machine')})")
+    regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+    if regressions:
+        print("\nREGRESSIONS vs baseline:")
+        for r in regressions:
+            print("  " + r)
+        return 1
+    print("No regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
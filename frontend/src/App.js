@@ -1,6 +1,6 @@
-import React, { useState } from 'react';
+import React, { useState, useRef, useEffect } from 'react';
 import CanvasEditor from './components/CanvasEditor';
-import { uploadPackshot, suggestLayouts, validateLayout, exportLayout, removeBg } from './api';
+import { uploadPackshot, variantUrl, suggestLayouts, exportLayout, previewLayout, removeBg, openValidationSession, sendValidationDeltas } from './api';
 
 function App() {
     const [elements, setElements] = useState([]);
@@ -11,6 +11,7 @@ function App() {
     const [generatedLayouts, setGeneratedLayouts] = useState([]);
     const [validationReport, setValidationReport] = useState(null);
     const [exportUrl, setExportUrl] = useState(null);
+    const [previewUrl, setPreviewUrl] = useState(null);
     const [isProcessing, setIsProcessing] = useState(false);
 
     const handleUpload = async (e) => {
@@ -20,6 +21,7 @@ function App() {
                 const data = await uploadPackshot(file);
                 setPackshotUrl(data.url);
                 setPackshotId(data.id);
+                validationSession.current = null; // whole layout replaced
                 setElements([
                     {
                         id: 'packshot-' + Date.now(),
@@ -45,19 +47,18 @@ function App() {
             try {
                 const data = await uploadPackshot(file); // Reuse existing endpoint
                 // Add as Logo Element (High Z-Index)
-                setElements(prev => [
-                    ...prev,
-                    {
-                        id: 'logo-' + Date.now(),
-                        type: 'logo', // Distinct type
-                        x: canvasSize.width - 250, // Top Right default
-                        y: 80, // Moved down as requested
-                        width: 200, // Smaller default
-                        height: 200,
-                        text: data.url,
-                        z_index: 100 // Always on top
-                    }
-                ]);
+                const logo = {
+                    id: 'logo-' + Date.now(),
+                    type: 'logo', // Distinct type
+                    x: canvasSize.width - 250, // Top Right default
+                    y: 80, // Moved down as requested
+                    width: 200, // Smaller default
+                    height: 200,
+                    text: data.url,
+                    z_index: 100 // Always on top
+                };
+                queueValidationDelta({ op: 'add', id: logo.id, element: logo });
+                setElements(prev => [...prev, logo]);
             } catch (error) {
                 console.error("Logo Upload failed", error);
             }
@@ -77,6 +78,9 @@ function App() {
                 } else {
                     setPackshotUrl(data.url); // Update with BG removed
                     // Also update the element on the canvas
+                    elementsRef.current
+                        .filter(el => el.type === 'packshot')
+                        .forEach(el => queueValidationDelta({ op: 'edit', id: el.id, fields: { text: data.url } }));
                     setElements(prevElements => prevElements.map(el => {
                         if (el.type === 'packshot') {
                             return { ...el, text: data.url };
@@ -117,11 +121,70 @@ function App() {
         const existingLogos = elements.filter(el => el.type === 'logo');
 
         setElements([...fixedElements, ...existingLogos]);
+        validationSession.current = null; // whole layout replaced
+    };
+
+    // Live validation session: { id, revision }. Edits after the first
+    // Validate click are sent as deltas and only changed checks come back.
+    const validationSession = useRef(null);
+    const deltaQueue = useRef(Promise.resolve());
+    const elementsRef = useRef(elements);
+    elementsRef.current = elements;
+
+    // Reads the ref (or an explicit list) so callers right after setElements
+    // don't validate a stale closure
+    const handleValidate = async (current = elementsRef.current) => {
+        const res = await openValidationSession(canvasSize.width, canvasSize.height, current);
+        validationSession.current = { id: res.session_id, revision: res.revision };
+        setValidationReport(res.report);
     };
 
-    const handleValidate = async () => {
-        const report = await validateLayout(canvasSize.width, canvasSize.height, elements);
-        setValidationReport(report);
+    // Canvas size changes invalidate the session; the next Validate reopens it
+    useEffect(() => {
+        validationSession.current = null;
+    }, [canvasSize.width, canvasSize.height]);
+
+    const mergeChangedChecks = (overallPass, changed) => {
+        setValidationReport(prev => {
+            if (!prev) return prev;
+            const byName = Object.fromEntries(changed.map(c => [c.check_name, c]));
+            return {
+                overall_pass: overallPass,
+                checks: prev.checks.map(c => byName[c.check_name] || c),
+            };
+        });
+    };
+
+    const queueValidationDelta = (delta) => {
+        if (!validationSession.current) return;
+        deltaQueue.current = deltaQueue.current.then(async () => {
+            const session = validationSession.current;
+            if (!session) return;
+            try {
+                const res = await sendValidationDeltas(session.id, session.revision, [delta]);
+                if (res.ok) {
+                    session.revision = res.data.revision;
+                    mergeChangedChecks(res.data.overall_pass, res.data.changed);
+                } else if (res.status === 404 || res.status === 409 || res.status === 422) {
+                    // Expired or out of sync: start over from the current layout
+                    const fresh = await openValidationSession(canvasSize.width, canvasSize.height, elementsRef.current);
+                    validationSession.current = { id: fresh.session_id, revision: fresh.revision };
+                    setValidationReport(fresh.report);
+                }
+            } catch (e) {
+                console.warn("Live validation failed", e);
+            }
+        });
+    };
+
+    const elementDelta = (id, attrs) => {
+        const { fontSize, ...rest } = attrs;
+        const fields = fontSize !== undefined ? { ...rest, font_size: fontSize } : rest;
+        const keys = Object.keys(fields);
+        if (keys.length > 0 && keys.every(k => k === 'x' || k === 'y')) {
+            return { op: 'move', id, ...fields };
+        }
+        return { op: 'edit', id, fields };
     };
 
     const handleExport = async () => {
@@ -129,8 +192,26 @@ function App() {
         setExportUrl(res.url);
     };
 
+    // Quarter-scale render first, then the full-size one replaces it
+    const handlePreview = async () => {
+        const current = elementsRef.current;
+        for (const scale of [0.25, 1]) {
+            try {
+                const url = await previewLayout(canvasSize.width, canvasSize.height, current, backgroundColor, scale);
+                setPreviewUrl(prev => {
+                    if (prev) URL.revokeObjectURL(prev);
+                    return url;
+                });
+            } catch (e) {
+                console.warn("Preview failed", e);
+                return;
+            }
+        }
+    };
+
     const updateElement = (key, value) => {
         if (selectedId) {
+            queueValidationDelta(elementDelta(selectedId, { [key]: value }));
             setElements(prev => prev.map(el => {
                 if (el.id === selectedId) {
                     return { ...el, [key]: value };
@@ -162,7 +243,8 @@ function App() {
             <header>
                 <h1>CreativeOS - Retail Media Builder</h1>
                 <div>
-                    <button onClick={handleValidate} className="secondary" style={{ width: 'auto', marginRight: 10 }}>Validate</button>
+                    <button onClick={() => handleValidate()} className="secondary" style={{ width: 'auto', marginRight: 10 }}>Validate</button>
+                    <button onClick={handlePreview} className="secondary" style={{ width: 'auto', marginRight: 10 }}>Preview</button>
                     <button onClick={handleExport} style={{ width: 'auto' }}>Export</button>
                 </div>
             </header>
@@ -175,7 +257,7 @@ function App() {
                         <input type="file" onChange={handleUpload} />
                         {packshotUrl && (
                             <div>
-                                <img src={`http://localhost:8000${packshotUrl}`} alt="preview" style={{ width: '100%', marginBottom: 5 }} />
+                                <img src={`http://localhost:8000${variantUrl(packshotUrl, 320)}`} alt="preview" style={{ width: '100%', marginBottom: 5 }} />
                                 <button onClick={handleRemoveBg} className="secondary" disabled={isProcessing}>
                                     {isProcessing ? "Processing..." : "Remove BG"}
                                 </button>
@@ -236,6 +318,7 @@ function App() {
                         selectedId={selectedId}
                         onSelectElement={setSelectedId}
                         onUpdateElement={(id, newAttrs) => {
+                            queueValidationDelta(elementDelta(id, newAttrs));
                             setElements(prev => prev.map(el => {
                                 if (el.id === id) {
                                     return { ...el, ...newAttrs };
@@ -328,8 +411,9 @@ function App() {
                                                 const fixedElements = await autoFixLayout(canvasSize.width, canvasSize.height, elements);
                                                 if (Array.isArray(fixedElements)) {
                                                     setElements(fixedElements);
-                                                    // Re-validate immediately
-                                                    setTimeout(handleValidate, 500);
+                                                    // Re-validate the fixed layout in a fresh session
+                                                    validationSession.current = null;
+                                                    handleValidate(fixedElements);
                                                 } else {
                                                     console.warn("Auto Check returned invalid data:", fixedElements);
                                                     alert("Auto Fix failed to return valid layout.");
@@ -348,6 +432,13 @@ function App() {
                         </div>
                     )}
 
+                    {previewUrl && (
+                        <div style={{ marginTop: 20 }}>
+                            <h4>Preview</h4>
+                            <img src={previewUrl} alt="Export preview" style={{ width: '100%', border: '1px solid #ddd' }} />
+                        </div>
+                    )}
+
                     {exportUrl && (
                         <div style={{ marginTop: 20 }}>
                             <h4>Export Ready</h4>
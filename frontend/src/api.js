@@ -1,5 +1,11 @@
 const API_URL = "http://localhost:8000";
 
+// "/uploads/<id>.png" -> resized, browser-negotiated (AVIF/WebP) variant
+export const variantUrl = (url, width) => {
+    const m = url && url.match(/^\/(uploads|exports)\/([^/?]+)$/);
+    return m ? `/variants/${m[1]}/${m[2]}?w=${width}` : url;
+};
+
 export const uploadPackshot = async (file) => {
     const formData = new FormData();
     formData.append("file", file);
@@ -26,6 +32,17 @@ export const suggestLayouts = async (packshotId, width, height) => {
     return res.json();
 };
 
+// Low-res render of the current canvas; returns an object URL for an <img>
+export const previewLayout = async (width, height, elements, backgroundColor, scale = 0.25) => {
+    const res = await fetch(`${API_URL}/export/preview?scale=${scale}`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ canvas_width: width, canvas_height: height, elements, background_color: backgroundColor }),
+    });
+    if (!res.ok) throw new Error(`Preview failed: ${res.status}`);
+    return URL.createObjectURL(await res.blob());
+};
+
 export const validateLayout = async (width, height, elements) => {
     // Validate endpoint expects query params for LayoutRequest (or body if model) + list of elements
     // But FastApi parses body. My main.py signature: validate(req: LayoutRequest, elements: List[LayoutElement])
@@ -74,3 +91,24 @@ export const exportLayout = async (width, height, elements, backgroundColor) =>
     });
     return res.json();
 };
+
+// Incremental validation: open a session with the full layout once, then
+// send element deltas tagged with the revision they were based on.
+export const openValidationSession = async (width, height, elements) => {
+    const res = await fetch(`${API_URL}/validate/sessions`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ width, height, elements }),
+    });
+    return res.json();
+};
+
+export const sendValidationDeltas = async (sessionId, baseRevision, deltas) => {
+    const res = await fetch(`${API_URL}/validate/sessions/${sessionId}/deltas`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ base_revision: baseRevision, deltas }),
+    });
+    // 404 (expired) / 409 (revision conflict) mean the caller should reopen
+    return { ok: res.ok, status: res.status, data: await res.json() };
+};
@@ -0,0 +1,47 @@
+import sys
+import os
+import json
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from PIL import Image
+
+import app.batch as batch
+import app.render as render
+from app.batch import run_batch, parse_canvases
+
+def test_batch_run_logs_items_and_resumes(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(batch, "UPLOAD_DIR", uploads)
+    monkeypatch.setattr(render, "UPLOAD_DIR", uploads)
+    Image.new("RGB", (300, 600), "orange").save(tmp_path / "tall.png")
+    (tmp_path / "manifest.csv").write_text(
+        "sku,packshot,headline,subhead\n"
+        "A1,tall.png,Fresh Taste,Only at Tesco\n"
+        "B2,tall.png,Win big today,\n"
+        "C3,missing.png,Fresh Taste,\n"
+        "../D4,tall.png,Fresh Taste,\n"
+    )
+    out = tmp_path / "out"
+    options = {"canvases": parse_canvases("1080x1080,1080x1920"), "format": "jpg", "max_kb": None, "remove_bg": False}
+    summary = run_batch(tmp_path / "manifest.csv", out, workers=0, options=options)
+    assert (summary["ok"], summary["failed"], summary["skipped"]) == (1, 3, 0)
+
+    records = {r["sku"]: r for r in map(json.loads, (out / "results.jsonl").read_text().splitlines())}
+    assert [o["canvas"] for o in records["A1"]["outputs"]] == ["1080x1080", "1080x1920"]
+    assert (out / "exports" / "A1_1080x1920.jpg").exists()
+    assert "forbidden_copy" in records["B2"]["error"]
+    assert records["C3"]["status"] == "failed"
+    assert "safe file name" in records["../D4"]["error"]
+    assert not (out / "D4_1080x1080.jpg").exists()
+    # The run's staging directory is gone; nothing is left in uploads
+    assert list(uploads.iterdir()) == []
+    # Staged packshots are copies, not links to the user's file
+    (uploads / "stage").mkdir()
+    staged = uploads / batch._stage_packshot(tmp_path / "tall.png", "stage")
+    assert staged.parent.name == "stage"
+    assert staged.stat().st_ino != (tmp_path / "tall.png").stat().st_ino
+
+    # Resume: finished SKUs are skipped, failures retried
+    summary = run_batch(tmp_path / "manifest.csv", out, workers=0, options=options)
+    assert (summary["ok"], summary["failed"], summary["skipped"]) == (0, 3, 1)
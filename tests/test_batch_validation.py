@@ -0,0 +1,44 @@
+import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.compliance import validate_layout
+from app.compliance_batch import validate_layouts_batch
+from app.schemas import LayoutElement, LayoutRequest, ValidationRequest
+
+def _layouts():
+    story = ValidationRequest(width=1080, height=1920, elements=[
+        LayoutElement(type="text", x=100, y=100, text="Header", font_size=50),
+        LayoutElement(type="packshot", x=100, y=1500, width=400, height=400),
+        LayoutElement(type="text", x=100, y=900, text="Win a discount", font_size=40),
+    ])
+    square = ValidationRequest(width=1200, height=1200, elements=[
+        LayoutElement(type="packshot", x=0, y=0, width=100, height=100) for _ in range(4)
+    ])
+    narrow = ValidationRequest(width=500, height=500, elements=[])
+    ok = ValidationRequest(width=1080, height=1920, elements=[
+        LayoutElement(type="text", x=100, y=300, text="Body", font_size=50),
+    ])
+    return [story, square, narrow, ok]
+
+def test_batch_matches_single_layout_validation():
+    layouts = _layouts()
+    batch = validate_layouts_batch(layouts)
+    for layout, report in zip(layouts, batch):
+        single = validate_layout(LayoutRequest(packshot_id="check", width=layout.width, height=layout.height), layout.elements)
+        assert report == single
+    assert [r.overall_pass for r in batch] == [False, False, False, True]
+
+def test_batch_endpoint_accepts_ndjson():
+    body = "\n".join(l.model_dump_json() for l in _layouts())
+    with TestClient(app) as client:
+        res = client.post("/validate/batch", content=body, headers={"content-type": "application/x-ndjson"})
+        assert res.status_code == 200
+        lines = [json.loads(l) for l in res.text.splitlines()]
+        assert [l["index"] for l in lines] == [0, 1, 2, 3]
+        assert lines[3]["report"]["overall_pass"] is True
+        bad = client.post("/validate/batch", content='{"width": 1}', headers={"content-type": "application/x-ndjson"})
+        assert bad.status_code == 422
@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.cache import DiskLRUCache, make_key
+
+def _src(tmp_path, name, size):
+    p = tmp_path / name
+    p.write_bytes(b"x" * size)
+    return p
+
+def test_hit_miss_and_lru_eviction(tmp_path):
+    cache = DiskLRUCache(tmp_path / "cache", max_bytes=250, fingerprint="m1", suffix=".png")
+    assert cache.get("a") is None
+    cache.put_file("a", _src(tmp_path, "a", 100))
+    cache.put_file("b", _src(tmp_path, "b", 100))
+    assert cache.get("a") is not None  # a is now most recent
+    cache.put_file("c", _src(tmp_path, "c", 100))  # over budget -> evict b
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["evictions"] == 1
+    assert stats["bytes"] == 200
+
+def test_fingerprint_change_invalidates(tmp_path):
+    cache = DiskLRUCache(tmp_path / "cache", max_bytes=1000, fingerprint="m1")
+    cache.put_file("a", _src(tmp_path, "a", 10))
+    # Same fingerprint on restart keeps entries
+    assert DiskLRUCache(tmp_path / "cache", max_bytes=1000, fingerprint="m1").get("a") is not None
+    # New model wipes them
+    assert DiskLRUCache(tmp_path / "cache", max_bytes=1000, fingerprint="m2").get("a") is None
+
+def test_key_depends_on_all_parts():
+    assert make_key("abc", "u2net") != make_key("abc", "isnet")
+    assert make_key("ab", "c") != make_key("a", "bc")
+
+def test_export_key_is_canonical_and_tracks_asset_content(tmp_path, monkeypatch):
+    import app.cache as cache_mod
+    from app.schemas import ExportRequest, LayoutElement
+    monkeypatch.setattr(cache_mod, "UPLOAD_DIR", tmp_path)
+    asset = _src(tmp_path, "p.png", 10)
+    el = LayoutElement(type="packshot", x=0, y=0, width=10, height=10, text="/uploads/p.png")
+    a = ExportRequest(canvas_width=100, canvas_height=100, elements=[el])
+    # Default max_kb spelled out is the same request
+    b = ExportRequest(canvas_width=100, canvas_height=100, elements=[el], max_kb=cache_mod.EXPORT_MAX_KB)
+    assert cache_mod.export_render_key(a) == cache_mod.export_render_key(b)
+    before = cache_mod.export_render_key(a)
+    asset.write_bytes(b"y" * 11)
+    assert cache_mod.export_render_key(a) != before
+
+def test_export_cache_dedups_and_bounds_directory(tmp_path):
+    from app.cache import ExportCache
+    exports = tmp_path / "exports"
+    cache = ExportCache(exports, tmp_path / "index", max_bytes=250)
+    for key in ("k1", "k2"):
+        _src(exports, f"{key}.jpg", 100)
+        cache.put(key, {"filename": f"{key}.jpg", "size_bytes": 100, "pid": 1, "timings": {}})
+    hit = cache.get("k1")
+    assert hit["filename"] == "k1.jpg" and "timings" not in hit
+    # k2 is now least recently used and goes first
+    _src(exports, "k3.jpg", 100)
+    cache.put("k3", {"filename": "k3.jpg", "size_bytes": 100})
+    assert not (exports / "k2.jpg").exists()
+    assert cache.get("k2") is None
+    assert cache.get("k1") is not None and cache.stats()["bytes"] == 200
+
+def test_content_hash_memo_tracks_rewrites_and_is_bounded(tmp_path):
+    from app import utils
+    path = tmp_path / "f.bin"
+    path.write_bytes(b"one")
+    first = utils.content_sha256(path)
+    path.write_bytes(b"second")
+    assert utils.content_sha256(path) != first
+    assert isinstance(utils._content_hashes, utils.LRUDict)
+    assert len(utils._content_hashes) <= utils.HASH_CACHE_SIZE
+
+def test_rembg_rerun_does_not_rewrite_linked_cache_entry(tmp_path, monkeypatch):
+    import types
+    from PIL import Image
+    from app import ai
+    from app.cache import link_or_copy
+    fake = types.SimpleNamespace(remove=lambda img, session=None, **kw: Image.new("RGBA", (8, 8), (0, 255, 0, 128)))
+    monkeypatch.setitem(sys.modules, "rembg", fake)
+    monkeypatch.setitem(ai._rembg_sessions, ai.REMBG_MODEL, object())
+    src, out = tmp_path / "p.png", tmp_path / "nobg_p.png"
+    Image.new("RGB", (8, 8), "red").save(src)
+    cache = DiskLRUCache(tmp_path / "cache", 10_000, "fp", ".png")
+    cached = cache.put_file("k", src)
+    link_or_copy(cached, out)  # what a cache hit leaves in uploads/
+    before = cached.read_bytes()
+    assert ai.remove_background_rembg(str(src), str(out))
+    assert cached.read_bytes() == before
+    assert out.read_bytes() != before and Image.open(out).size == (8, 8)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache", "nobg_p.png", "p.png"]
+
+def test_discard_drops_entries(tmp_path):
+    from app.cache import ExportCache
+    cache = DiskLRUCache(tmp_path / "c", 10_000, "fp", ".bin")
+    cache.put_file("a", _src(tmp_path, "a", 100))
+    cache.discard("a")
+    cache.discard("missing")
+    assert cache.get("a") is None and cache.stats()["bytes"] == 0
+    exports = ExportCache(tmp_path / "exports", tmp_path / "index", 10_000)
+    (tmp_path / "exports" / "e.jpg").write_bytes(b"x" * 10)
+    exports.put("k", {"filename": "e.jpg", "size_bytes": 10})
+    exports.discard("k")
+    assert not list((tmp_path / "exports").iterdir()) and not list((tmp_path / "index").iterdir())
+    assert exports.stats()["bytes"] == 0
@@ -44,3 +44,99 @@ def test_packshot_count():
     # We can test the logic conceptually or refactor. 
     # For now, I will skip unit testing the orchestration and focus on the pure logic functions.
     pass
+
+def test_file_size_check():
+    from app.compliance import check_file_size
+    assert check_file_size().passed == True  # pre-export: deferred
+    assert check_file_size(400 * 1024, max_kb=500, passes=3).passed == True
+    res = check_file_size(600 * 1024, max_kb=500)
+    assert res.passed == False
+    assert "600.0KB" in res.details
+
+def test_copy_word_boundaries_and_case():
+    def flagged(text):
+        return not check_copy([LayoutElement(type="text", x=0, y=0, text=text)]).passed
+    assert not flagged("Fine wine for your window")
+    assert flagged("WIN a trip!")
+    assert flagged("Ｗｉｎ big")  # full-width letters
+    assert flagged("Now 20% OFF")
+    assert flagged("Money   back guarantee")
+    assert not flagged("Our offer: 20% offers")
+
+def test_copy_rules_reload_from_file(tmp_path):
+    import json, time
+    from app.copy_rules import CopyRuleLoader
+    path = tmp_path / "rules.json"
+    loader = CopyRuleLoader(path, ["win"])
+    assert loader.get().version == "builtin"
+    path.write_text(json.dumps({"version": "v2", "phrases": ["free gift", "Clinically proven"]}))
+    rules = loader.get()
+    assert rules.version == "v2"
+    assert loader.get() is rules  # unchanged file -> same compiled rules
+    assert rules.find("CLINICALLY proven, with a free gift") == ["Clinically proven", "free gift"]
+    assert rules.find("Win") == []
+
+def test_geometry_rules():
+    from app.compliance import check_canvas_bounds, check_overlaps
+    els = [
+        LayoutElement(type="packshot", x=100, y=100, width=400, height=400),
+        LayoutElement(type="text", x=300, y=300, width=300, height=60, text="Headline"),  # over packshot
+        LayoutElement(type="text", x=700, y=100, width=200, height=200, text="", tile_type="New"),
+        LayoutElement(type="text", x=650, y=250, width=300, height=60, text="Subhead"),  # under tile
+        LayoutElement(type="shape", x=0, y=0, width=1200, height=1200),  # background: ignored
+        LayoutElement(type="logo", x=1100, y=1100, width=200, height=200),  # off canvas
+    ]
+    res = check_overlaps(els)
+    assert res.passed == False
+    assert "Text 'Headline' overlaps packshot" in res.details
+    assert "Value tile 'New' collides with 'Subhead'" in res.details
+    assert "shape" not in res.details
+    bounds = check_canvas_bounds(els, 1200, 1200)
+    assert bounds.passed == False and "logo" in bounds.details
+    assert check_canvas_bounds(els[:5], 1200, 1200).passed == True
+
+def test_spatial_index_matches_brute_force():
+    import random
+    from app.geometry import SpatialIndex
+    rng = random.Random(7)
+    boxes = []
+    for _ in range(300):
+        x, y = rng.uniform(0, 2000), rng.uniform(0, 2000)
+        boxes.append((x, y, x + rng.uniform(1, 200), y + rng.uniform(1, 200)))
+    brute = [(i, j) for i in range(len(boxes)) for j in range(i + 1, len(boxes))
+             if boxes[i][0] < boxes[j][2] and boxes[j][0] < boxes[i][2]
+             and boxes[i][1] < boxes[j][3] and boxes[j][1] < boxes[i][3]]
+    assert SpatialIndex(boxes).overlapping_pairs() == brute
+
+def test_text_measurement_wraps_to_width():
+    from app.textmetrics import measure_text
+    one = measure_text("Fresh summer flavours", "Arial", 60)
+    assert len(one.lines) == 1 and one.height == one.line_height
+    wrapped = measure_text("Fresh summer flavours", "Arial", 60, max_width=one.width / 2)
+    assert len(wrapped.lines) > 1
+    assert " ".join(wrapped.lines) == "Fresh summer flavours"
+    assert wrapped.width <= one.width / 2 + 0.5
+    # Over-long words are broken rather than overflowing the box
+    assert all(len(line) < 20 for line in measure_text("x" * 40, "Arial", 60, max_width=300).lines)
+
+def test_wrapped_text_safe_zone_uses_measured_height():
+    # One line tall by font size, four lines once wrapped to 300px
+    el = LayoutElement(type="text", x=100, y=1500, width=300, text="Big summer savings on every pack", font_size=60)
+    result = check_safe_zones([el], 1080, 1920)
+    assert result.passed == False and "too low" in result.details
+
+    from app.compliance import auto_fix_elements
+    fixed = auto_fix_elements([el], 1080, 1920)
+    assert check_safe_zones(fixed, 1080, 1920).passed == True
+
+def test_render_draws_measured_lines():
+    from app.geometry import element_bbox
+    from app.render import render_layout
+    from app.schemas import ExportRequest
+    el = LayoutElement(type="text", x=20, y=20, width=200, text="Wrapped headline text here", font_size=40, color="#000000")
+    img = render_layout(ExportRequest(canvas_width=400, canvas_height=400, elements=[el])).convert("L")
+    ink = img.point(lambda v: 255 if v < 128 else 0).getbbox()
+    x0, y0, x1, y1 = element_bbox(el)
+    # Ink stays inside the measured box and spans more than one line
+    assert ink[0] >= x0 and ink[2] <= x1 + 1 and ink[3] <= y1 + 1
+    assert ink[3] - ink[1] > 40
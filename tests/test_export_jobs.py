@@ -0,0 +1,105 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import asyncio
+import io
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import jobs
+from app.cache import ExportCache
+from app.main import app, export_jobs
+from app.schemas import ExportRequest
+from app.workers import WorkerPool
+from app.utils import EXPORT_DIR
+
+def _request(text):
+    return {"canvas_width": 540, "canvas_height": 960, "format": "jpg",
+            "elements": [{"type": "text", "x": 40, "y": 300, "text": text, "font_size": 48}]}
+
+@pytest.fixture
+def export_cache(tmp_path, monkeypatch):
+    # Fresh index so nothing from earlier runs is a hit; workers still write to EXPORT_DIR
+    cache = ExportCache(EXPORT_DIR, tmp_path / "index", max_bytes=10**12)
+    monkeypatch.setattr(jobs, "get_export_cache", lambda: cache)
+    monkeypatch.setattr(jobs, "schedule_variants", lambda kind, filename: None)
+    yield cache
+    for entry in (tmp_path / "index").glob("*.json"):
+        cache.discard(entry.stem)
+
+@pytest.fixture
+def client(export_cache):
+    with TestClient(app) as c:
+        yield c
+
+def _poll(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f"/export/jobs/{job_id}").json()
+        assert status["status"] in ("queued", "running", "done")
+        if status["status"] == "done" or time.monotonic() > deadline:
+            return status
+        time.sleep(0.02)
+
+def test_submit_and_poll_export_job(client):
+    r = client.post("/export/jobs", json=_request("Polled"))
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+    status = _poll(client, job_id)
+    assert status["status"] == "done" and status["error"] is None
+    result = status["result"]
+    assert result["url"].startswith("/exports/") and result["format"] == "jpg"
+    assert result["cached"] is False and result["file_size_check"]["passed"]
+    assert result["thumbnail_url"] == f"/variants/exports/{result['url'].rsplit('/', 1)[-1]}?w=320"
+    assert status["render_ms"] > 0 and status["total_ms"] >= status["queue_ms"]
+    # The file is served where the result says, at the requested size
+    image = client.get(result["url"])
+    assert image.status_code == 200
+    assert abs(len(image.content) / 1024 - result["size_kb"]) < 0.01
+    assert Image.open(io.BytesIO(image.content)).size == (540, 960)
+    # /wait on a finished job answers straight away
+    assert client.get(f"/export/jobs/{job_id}/wait", params={"timeout": 0}).json()["status"] == "done"
+
+def test_export_waits_for_result(client):
+    r = client.post("/export", json=_request("Synchronous"))
+    assert r.status_code == 200
+    body = r.json()
+    assert body["url"].startswith("/exports/") and body["size_kb"] > 0
+    assert (EXPORT_DIR / body["url"].rsplit("/", 1)[-1]).exists()
+
+def test_unknown_export_job(client):
+    assert client.get("/export/jobs/nope").status_code == 404
+    assert client.get("/export/jobs/nope/wait").status_code == 404
+
+def test_concurrent_identical_exports_render_once(export_cache):
+    manager = jobs.ExportJobManager(WorkerPool("test-export", max_workers=1, max_pending=4))
+    req = ExportRequest.model_validate(_request("Deduplicated"))
+
+    async def submit_both():
+        # Same tick: neither job has looked up the render key yet
+        first, second = manager.submit(req), manager.submit(req)
+        await asyncio.gather(first.task, second.task)
+        return first, second
+    try:
+        first, second = asyncio.run(submit_both())
+    finally:
+        manager.shutdown()
+    # One job rendered; the other waited on it and reused the output
+    assert manager.pool.completed == 1
+    assert first.id != second.id
+    assert sorted(job.result.get("cached", False) for job in (first, second)) == [False, True]
+    assert first.result["filename"] == second.result["filename"]
+
+def test_repeat_export_is_served_from_cache(client, export_cache):
+    req = _request("Repeated")
+    first = client.post("/export", json=req).json()
+    before = export_jobs.pool.completed
+    again = client.post("/export", json=req).json()
+    assert first["cached"] is False and again["cached"] is True
+    assert again["url"] == first["url"] and again["size_kb"] == first["size_kb"]
+    assert export_jobs.pool.completed == before  # no new render
+    assert export_cache.stats()["hits"] >= 1
@@ -0,0 +1,63 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.layout_engine import enumerate_candidates, generate_layouts
+from app.compliance import validate_layout
+from app.schemas import LayoutRequest
+
+@pytest.mark.parametrize("width,height,aspect", [(1080, 1080, 1.0), (1080, 1920, 0.5), (1200, 628, 2.0)])
+def test_generated_layouts_are_compliant(width, height, aspect):
+    proposals = generate_layouts("pack.png", width, height, aspect, value_tile="New", count=3)
+    assert len(proposals) == 3
+    # Best-first, and distinct arrangements
+    assert len({p.name for p in proposals}) == 3
+    assert [p.score for p in proposals] == sorted((p.score for p in proposals), reverse=True)
+
+    req = LayoutRequest(packshot_id="pack.png", width=width, height=height)
+    for p in proposals:
+        assert (p.canvas_width, p.canvas_height) == (width, height)
+        assert validate_layout(req, p.elements).overall_pass
+        packshot = next(el for el in p.elements if el.type == "packshot")
+        assert packshot.text == "pack.png"
+        # Packshot keeps the image's shape
+        assert packshot.width / packshot.height == pytest.approx(aspect, rel=0.01)
+
+def test_candidate_space_and_budget():
+    valid, considered = enumerate_candidates(1080, 1080, 1.0, "Big Headline", "Subheading", None, budget_ms=1e6)
+    assert considered >= 50 and valid
+    # An exhausted budget stops enumeration instead of running over
+    valid, considered = enumerate_candidates(1080, 1080, 1.0, "Big Headline", "Subheading", None, budget_ms=0)
+    assert considered == 0 and valid == []
+
+def test_memoized_per_element_set():
+    a = generate_layouts("a.png", 1080, 1080, 0.75)
+    b = generate_layouts("b.png", 1080, 1080, 0.75)
+    # Same cache entry, different packshot reference, independent objects
+    assert [p.elements[0].x for p in a] == [p.elements[0].x for p in b]
+    assert a[0].elements[0].text == "a.png" and b[0].elements[0].text == "b.png"
+    other = generate_layouts("a.png", 1080, 1080, 0.75, headline="A much longer headline here")
+    assert [el.text for el in other[0].elements if el.type == "text"][0] == "A much longer headline here"
+
+def test_budget_cut_runs_are_not_memoized(monkeypatch):
+    import app.layout_engine as engine
+    engine.clear_layout_cache()
+    # Zero budget: enumeration stops before the first candidate
+    monkeypatch.setattr(engine, "LAYOUT_BUDGET_MS", 0)
+    assert engine.generate_layouts("/uploads/p.png", 1080, 1080, 1.0) == []
+    assert len(engine._layout_cache) == 0
+    monkeypatch.undo()
+    # With time to finish, the same arguments get real proposals and are kept
+    assert len(engine.generate_layouts("/uploads/p.png", 1080, 1080, 1.0)) == 3
+    assert len(engine._layout_cache) == 1
+
+def test_suggest_layouts_rejects_empty_canvas():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    for w, h in ((0, 1080), (1080, 0), (-5, 1080)):
+        r = client.post("/suggest-layouts", json={"packshot_id": "p.png", "width": w, "height": h})
+        assert r.status_code == 422
+    # /validate only adapts its layout to a LayoutRequest; the new bound must not turn that into a 500
+    assert client.post("/validate", json={"width": 0, "height": 1080, "elements": []}).status_code == 200
@@ -0,0 +1,39 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fastapi.testclient import TestClient
+
+from app.metrics import MetricsRegistry, server_timing
+from app.main import app
+
+def test_prometheus_text_format():
+    reg = MetricsRegistry()
+    hist = reg.histogram("t_seconds", "Test.", buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="a")
+    hist.observe(0.5, stage="a")
+    reg.counter("t_total", "Test.").inc(route='/x"y')
+    text = reg.render()
+    assert "# TYPE t_seconds histogram" in text
+    # Buckets are cumulative
+    assert 't_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="a",le="1"} 2' in text
+    assert 't_seconds_bucket{stage="a",le="+Inf"} 2' in text
+    assert 't_seconds_count{stage="a"} 2' in text
+    assert 't_total{route="/x\\"y"} 1' in text
+
+def test_server_timing_merges_repeated_stages():
+    header = server_timing([("encode", 0.002), ("write", 0.001), ("encode", 0.003)], total=0.01)
+    assert header == "encode;dur=5.0, write;dur=1.0, total;dur=10.0"
+
+def test_validate_request_is_timed():
+    client = TestClient(app)
+    r = client.post("/validate", json={"width": 1080, "height": 1080, "elements": []})
+    assert r.status_code == 200
+    timing = r.headers["Server-Timing"]
+    assert timing.startswith("request_parse;dur=")
+    assert "validate;dur=" in timing and "response_encode;dur=" in timing
+
+    text = client.get("/metrics").text
+    assert 'creativeos_stage_seconds_count{stage="validate"}' in text
+    assert 'creativeos_requests_total{method="POST",route="/validate",status="200"}' in text
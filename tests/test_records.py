@@ -0,0 +1,101 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import copy
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.main import app
+from app.records import ElementRecord, parse_element, parse_layout, ELEMENT_FIELDS
+from app.schemas import LayoutElement
+from app import serialization
+
+ELEMENTS = [
+    {"type": "text", "x": 10, "y": 300, "text": "Hello", "font_size": 40, "rotation": 15},
+    {"type": "packshot", "x": 500.5, "y": 400, "width": 300, "height": 300, "text": "/uploads/p.png", "z_index": None},
+    {"type": "text", "x": 0, "y": 0, "text": "New", "tile_type": "New", "price": "1.00"},
+]
+
+def test_records_match_model_dump():
+    assert ELEMENT_FIELDS == tuple(LayoutElement.model_fields)
+    for data in ELEMENTS:
+        rec = parse_element(data)
+        assert rec is not None
+        # Same values and key order as the model, extra frontend fields ignored
+        assert list(rec.to_dict().items()) == list(LayoutElement.model_validate(data).model_dump().items())
+    clone = copy.copy(rec)
+    clone.y = 99
+    assert rec.y == 0 and clone != rec
+
+def test_irregular_payloads_fall_back_to_pydantic():
+    # Coercible values: the fast path declines, pydantic converts
+    assert parse_element({"type": "text", "x": "10", "y": 0}) is None
+    layout = parse_layout({"width": 1080, "height": 1080, "elements": [{"type": "text", "x": "10", "y": 0}]})
+    assert isinstance(layout.elements[0], ElementRecord) and layout.elements[0].x == 10.0
+    with pytest.raises(ValidationError):
+        parse_layout({"width": 1080, "height": 1080, "elements": [{"type": "video", "x": 0, "y": 0}]})
+
+def test_validate_and_auto_fix_endpoints():
+    client = TestClient(app)
+    body = {"width": 1080, "height": 1920, "elements": ELEMENTS}
+    r = client.post("/validate", json=body)
+    assert r.status_code == 200 and r.headers["content-type"] == "application/json"
+    assert r.json()["overall_pass"] == False
+    # Stringly-typed numbers take the pydantic path and give the same report
+    slow = {**body, "elements": [{**el, "x": str(el["x"])} for el in ELEMENTS]}
+    assert client.post("/validate", json=slow).json() == r.json()
+
+    fixed = client.post("/auto-fix", json=body).json()
+    assert [el["y"] for el in fixed] == [300.0, 400.0, 210.0]
+    assert all(isinstance(el[k], float) for el in fixed for k in ("x", "y", "width", "height"))
+    assert client.post("/auto-fix", json={"width": 1080}).status_code == 422
+    assert client.post("/validate", content=b"{not json", headers={"content-type": "application/json"}).status_code == 422
+
+def test_msgpack_negotiation():
+    client = TestClient(app)
+    body = {"width": 1080, "height": 1080, "elements": ELEMENTS}
+    r = client.post("/validate", json=body, headers={"Accept": "application/msgpack"})
+    assert "Accept" in r.headers["vary"]
+    if serialization.msgpack is None:
+        # Not installed: JSON replies, MessagePack bodies are refused
+        assert r.headers["content-type"] == "application/json"
+        r = client.post("/validate", content=b"\x80", headers={"content-type": "application/msgpack"})
+        assert r.status_code == 415
+    else:
+        assert r.headers["content-type"] == "application/msgpack"
+        report = serialization.msgpack.unpackb(r.content, raw=False)
+        assert report == client.post("/validate", json=body).json()
+
+def test_msgpack_negotiation_with_encoder(monkeypatch):
+    import json
+    import types
+    # Stand-in encoder so this runs whether or not msgpack is installed
+    fake = types.SimpleNamespace(packb=lambda obj, use_bin_type=True: b"MP" + json.dumps(obj).encode(),
+                                 unpackb=lambda data, raw=False: json.loads(data[2:]))
+    monkeypatch.setattr(serialization, "msgpack", fake)
+    assert serialization.negotiate("application/msgpack") == "application/msgpack"
+    assert serialization.negotiate("application/json, application/x-msgpack") == "application/msgpack"
+    assert serialization.negotiate("application/msgpack;q=0, application/json") == "application/json"
+    assert serialization.negotiate("application/msgpack;q=0.5, application/json") == "application/json"
+    assert serialization.negotiate("application/msgpack, */*;q=0.8") == "application/msgpack"
+    assert serialization.negotiate("*/*") == "application/json"
+    assert serialization.negotiate(None) == "application/json"
+
+    client = TestClient(app)
+    body = {"width": 1080, "height": 1080, "elements": ELEMENTS}
+    r = client.post("/validate", content=fake.packb(body),
+                    headers={"content-type": "application/msgpack", "accept": "application/msgpack"})
+    assert r.headers["content-type"] == "application/msgpack"
+    assert fake.unpackb(r.content) == client.post("/validate", json=body).json()
+    r = client.post("/validate", json=body, headers={"accept": "application/msgpack;q=0, application/json"})
+    assert r.headers["content-type"] == "application/json"
+
+def test_openapi_documents_layout_bodies():
+    schema = TestClient(app).get("/openapi.json").json()
+    assert "ValidationRequest" in schema["components"]["schemas"]
+    for path in ("/validate", "/auto-fix"):
+        body = schema["paths"][path]["post"]["requestBody"]
+        assert body["content"]["application/json"]["schema"]["$ref"] == "#/components/schemas/ValidationRequest"
@@ -0,0 +1,148 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from PIL import Image
+from app.render import render_export
+
+def test_render_export_writes_file_and_timings(tmp_path):
+    req = {
+        "canvas_width": 400,
+        "canvas_height": 300,
+        "background_color": "#ff0000",
+        "elements": [{"type": "text", "x": 10, "y": 10, "text": "Hello", "font_size": 30}],
+    }
+    res = render_export(req, out_dir=tmp_path)
+    out = tmp_path / res["filename"]
+    assert out.exists()
+    assert res["size_bytes"] == out.stat().st_size
+    assert set(res["timings"]) >= {"render_ms", "encode_ms"}
+    with Image.open(out) as img:
+        assert img.size == (400, 300)
+
+def test_font_registry_caches_faces_and_honors_size():
+    from app.fonts import FontRegistry
+    reg = FontRegistry(dirs=[])  # nothing installed -> scalable built-in font
+    assert reg.resolve("Arial") is None
+    font = reg.get_font("Arial", 48)
+    assert reg.get_font("Arial", 48) is font
+    assert reg.get_font("Arial", 20) is not font
+    assert font.getbbox("H")[3] > reg.get_font("Arial", 20).getbbox("H")[3]
+    assert reg.stats()["hits"] == 2
+
+def test_asset_cache_reuses_tiles_and_evicts_by_bytes(tmp_path):
+    from app.assets import AssetCache
+    path = tmp_path / "p.png"
+    Image.new("RGB", (100, 100), "blue").save(path)
+    cache = AssetCache(max_bytes=100 * 100 * 4 + 50 * 50 * 4)
+    tile = cache.get_tile(path, 50, 50)
+    assert tile.size == (50, 50) and tile.mode == "RGBA"
+    assert cache.get_tile(path, 50, 50) is tile
+    # A second size pushes the total over budget, evicting the LRU entry
+    cache.get_tile(path, 60, 60)
+    stats = cache.stats()
+    assert stats["evictions"] >= 1
+    assert stats["bytes"] <= cache.max_bytes
+    assert stats["hits"] >= 1
+
+def test_preview_scales_request_and_uses_reduced_sources(tmp_path):
+    import io
+    from app.assets import AssetCache
+    from app.render import render_preview, scale_request
+    from app.schemas import ExportRequest, LayoutElement
+    req = ExportRequest(canvas_width=1080, canvas_height=1920, elements=[
+        LayoutElement(type="text", x=100, y=400, width=500, text="Hello", font_size=64),
+    ])
+    small = scale_request(req, 0.25)
+    assert (small.canvas_width, small.canvas_height) == (270, 480)
+    assert (small.elements[0].x, small.elements[0].width, small.elements[0].font_size) == (25, 125, 16)
+    assert req.elements[0].font_size == 64  # original untouched
+
+    data, media_type = render_preview(req, 0.25)
+    assert media_type == "image/jpeg"
+    assert Image.open(io.BytesIO(data)).size == (270, 480)
+
+    path = tmp_path / "big.jpg"
+    Image.new("RGB", (800, 800), "green").save(path)
+    cache = AssetCache()
+    tile = cache.get_tile(path, 100, 100, reduced=True)
+    assert tile.size == (100, 100)
+    # Cut straight from the 1/8 reduction, never the full-size decode
+    keys = list(cache._items)
+    assert (str(path), keys[0][1], None, None, 8) in keys
+    assert not any(k[2] is None and k[4] == 1 for k in keys)
+    # Hits don't re-read the image header
+    calls = []
+    cache._reduce_factor = lambda *a: calls.append(a) or 8
+    assert cache.get_tile(path, 100, 100, reduced=True) is tile
+    assert calls == []
+
+def test_preview_scales_images_drawn_at_natural_size(tmp_path, monkeypatch):
+    import io
+    from app import render
+    from app.schemas import ExportRequest, LayoutElement
+    monkeypatch.setattr(render, "UPLOAD_DIR", tmp_path)
+    Image.new("RGB", (200, 200), "red").save(tmp_path / "logo.png")
+    req = ExportRequest(canvas_width=400, canvas_height=400, format="png", elements=[
+        LayoutElement(type="logo", x=0, y=0, text="/uploads/logo.png"),
+    ])
+    small = render.scale_request(req, 0.25)
+    assert (small.elements[0].width, small.elements[0].height) == (50, 50)
+    data, _ = render.render_preview(req, 0.25)
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    # Same proportions as the export: a quarter of the canvas, not all of it
+    assert img.getpixel((40, 40)) == (255, 0, 0) and img.getpixel((60, 60)) == (255, 255, 255)
+
+def test_preview_stream_renders_full_scale_in_export_worker():
+    from fastapi.testclient import TestClient
+    from app.main import app, export_jobs
+    body = {"canvas_width": 400, "canvas_height": 400,
+            "elements": [{"type": "text", "x": 10, "y": 10, "text": "Hi", "font_size": 30}]}
+    with TestClient(app) as client:
+        before = export_jobs.pool.completed
+        r = client.post("/export/preview/stream?scales=0.25,1", json=body)
+        assert r.status_code == 200
+        assert r.content.count(b"X-Preview-Scale:") == 2
+        # Only the full-scale frame went to the worker pool
+        assert export_jobs.pool.completed == before + 1
+
+def test_encoder_hits_byte_budget():
+    from app.encode import encode_to_budget
+    img = Image.radial_gradient("L").resize((1080, 1080)).convert("RGB")
+    img.paste(Image.effect_noise((540, 540), 80).convert("RGB"), (0, 0))
+    full = encode_to_budget(img, "jpg", max_kb=10_000)
+    assert full.quality == 95 and full.passes == 1
+    small = encode_to_budget(img, "jpg", max_kb=full.size // 1024 // 2)
+    assert small.within_budget and small.quality < 95
+    assert small.size >= small.max_bytes * 0.5
+    png = encode_to_budget(img, "png", max_kb=full.size // 1024 // 2)
+    assert png.extension == "png" and png.passes >= 2
+
+def test_retarget_square_to_story_keeps_elements_on_canvas():
+    from app.retarget import retarget_elements
+    from app.schemas import LayoutElement
+    els = [
+        LayoutElement(type="packshot", x=100, y=300, width=500, height=500),
+        LayoutElement(type="text", x=650, y=50, text="Headline", font_size=80),
+    ]
+    out = retarget_elements(els, 1200, 1200, 1080, 1920, scaling="fit", reflow=True)
+    assert out[0].width == 450 and out[0].height == 450  # uniform 0.9
+    assert out[1].font_size == 72
+    for el in out:
+        assert 0 <= el.x and el.x + el.width <= 1080
+        assert el.y >= 200  # pushed out of the 9:16 top safe zone
+    rigid = retarget_elements(els, 1200, 1200, 1080, 1920, scaling="fit", reflow=False)
+    assert rigid[0].x == 90 and rigid[0].y == 300 * 0.9 + (1920 - 1080) / 2
+    assert els[0].x == 100  # inputs untouched
+
+def test_batch_export_rejects_zero_sizes():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    body = {"canvas_width": 0, "canvas_height": 1080, "elements": [], "targets": [{"width": 1080, "height": 1920}]}
+    assert client.post("/export/batch", json=body).status_code == 422
+    body = {**body, "canvas_width": 1080, "targets": [{"width": 1080, "height": 0}]}
+    assert client.post("/export/batch", json=body).status_code == 422
+    single = {"canvas_width": 0, "canvas_height": 1080, "elements": []}
+    for path in ("/export", "/export/jobs", "/export/preview"):
+        assert client.post(path, json=single).status_code == 422
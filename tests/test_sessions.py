@@ -0,0 +1,68 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import pytest
+from app.compliance import validate_layout
+from app.schemas import ElementDelta, LayoutElement, LayoutRequest
+from app.sessions import ValidationSession, RevisionConflict
+
+def _session():
+    return ValidationSession(1080, 1920, [
+        LayoutElement(id="head", type="text", x=100, y=300, text="Headline", font_size=50),
+        LayoutElement(id="shot", type="packshot", x=100, y=600, width=400, height=400),
+    ])
+
+def test_deltas_return_only_changed_checks():
+    s = _session()
+    assert s.report().overall_pass
+    ok, changed = s.apply(0, [ElementDelta(op="move", id="head", y=50)])
+    assert not ok
+    assert [c.check_name for c in changed] == ["safe_zones"]
+    ok, changed = s.apply(1, [ElementDelta(op="edit", id="head", fields={"text": "Win big"})])
+    assert {c.check_name for c in changed} == {"safe_zones", "forbidden_copy"}  # label + copy
+    ok, changed = s.apply(2, [ElementDelta(op="delete", id="head")])
+    assert ok and s.revision == 3
+    # Session state agrees with a from-scratch validation
+    full = validate_layout(LayoutRequest(packshot_id="c", width=1080, height=1920), list(s.elements.values()))
+    assert full.checks == s._checks()
+
+def test_stale_revision_and_bad_delta_leave_session_untouched():
+    s = _session()
+    s.report()
+    with pytest.raises(RevisionConflict):
+        s.apply(5, [ElementDelta(op="delete", id="head")])
+    with pytest.raises(ValueError):
+        s.apply(0, [ElementDelta(op="delete", id="head"), ElementDelta(op="delete", id="missing")])
+    assert list(s.elements) == ["head", "shot"] and s.revision == 0
+
+def test_duplicate_ids_are_rejected():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.sessions import DeltaError
+    s = _session()
+    s.report()
+    with pytest.raises(DeltaError, match="'shot' already exists"):
+        s.apply(0, [ElementDelta(op="add", id="shot", element=LayoutElement(type="text", x=0, y=300, text="x"))])
+    assert s.elements["shot"].type == "packshot" and s.revision == 0
+
+    client = TestClient(app)
+    el = {"id": "a", "type": "text", "x": 0, "y": 300, "text": "Hi"}
+    r = client.post("/validate/sessions", json={"width": 1080, "height": 1920, "elements": [el, el]})
+    assert r.status_code == 422 and "'a'" in r.json()["detail"]
+    opened = client.post("/validate/sessions", json={"width": 1080, "height": 1920, "elements": [el]}).json()
+    r = client.post(f"/validate/sessions/{opened['session_id']}/deltas",
+                    json={"base_revision": 0, "deltas": [{"op": "add", "id": "a", "element": el}]})
+    assert r.status_code == 422 and "'a'" in r.json()["detail"]
+
+def test_copy_cache_follows_rule_content(monkeypatch):
+    from app import sessions
+    from app.copy_rules import CopyRuleSet
+    rules = CopyRuleSet(["win"], version="1")
+    monkeypatch.setattr(sessions, "get_copy_rules", lambda: rules)
+    s = ValidationSession(1080, 1080, [LayoutElement(id="t", type="text", x=100, y=300, text="Fresh deals")])
+    assert s.report().overall_pass
+    # Same version string, different phrases: the cached result must not survive
+    rules = CopyRuleSet(["fresh"], version="1")
+    ok, changed = s.apply(0, [])
+    assert not ok and [c.check_name for c in changed] == ["forbidden_copy"]
@@ -0,0 +1,70 @@
+import io
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from app import main, utils
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(main, "schedule_variants", lambda kind, filename: None)
+    return tmp_path
+
+@pytest.fixture
+def client(uploads):
+    with TestClient(main.app) as c:
+        yield c
+
+def _png(w, h):
+    buf = io.BytesIO()
+    Image.new("RGB", (w, h), "green").save(buf, format="PNG")
+    return buf.getvalue()
+
+def test_upload_reports_real_dimensions(client, uploads, monkeypatch):
+    data = _png(320, 180)
+    res = client.post("/upload", files={"file": ("shot.png", data, "image/png")})
+    assert res.status_code == 200
+    body = res.json()
+    assert (body["width"], body["height"], body["format"]) == (320, 180, "PNG")
+    assert body["size_bytes"] == len(data)
+    assert (uploads / body["id"]).read_bytes() == data
+    # Hashed while streaming in: looking it up doesn't re-read the file
+    monkeypatch.setattr(utils, "file_sha256", None)
+    assert utils.content_sha256(uploads / body["id"]) == body["sha256"]
+
+def test_upload_rejects_non_images_and_oversize(client, uploads, monkeypatch):
+    before = set(os.listdir(uploads))
+    res = client.post("/upload", files={"file": ("notes.txt", b"hello", "text/plain")})
+    assert res.status_code == 400
+    monkeypatch.setattr(main, "UPLOAD_MAX_MB", 0)
+    res = client.post("/upload", files={"file": ("shot.png", _png(64, 64), "image/png")})
+    assert res.status_code == 413
+    assert set(os.listdir(uploads)) == before  # no partial files left
+
+def test_upload_hash_memo_is_bounded():
+    memo = utils.LRUDict(2)
+    for i in range(5):
+        memo[i] = str(i)
+    assert len(memo) == 2 and memo.get(0) is None and memo.get(4) == "4"
+
+def test_remove_bg_hashes_current_content(client, uploads, monkeypatch, tmp_path_factory):
+    from app.cache import DiskLRUCache, rembg_cache_key
+    cache = DiskLRUCache(tmp_path_factory.mktemp("rembg"), 10**6, "fp", ".png")
+    monkeypatch.setattr(main, "get_rembg_cache", lambda: cache)
+    src = uploads / "nobg_a.png"
+    for i, color in enumerate(("red", "blue")):
+        # A cutout rewritten under the same name, each version with its own cached result
+        Image.new("RGB", (8, 8), color).save(src)
+        os.utime(src, ns=(i * 10**9, i * 10**9))
+        out = uploads / f"out_{color}.png"
+        Image.new("RGB", (4, 4), color).save(out)
+        cache.put_file(rembg_cache_key(utils.content_sha256(src)), out)
+    res = client.post("/remove-bg", params={"packshot_id": "nobg_a.png"})
+    assert res.json()["cached"] is True
+    assert (uploads / "nobg_nobg_a.png").read_bytes() == (uploads / "out_blue.png").read_bytes()
+    assert not [p for p in os.listdir(uploads) if p.endswith(".tmp")]
@@ -0,0 +1,83 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from PIL import Image
+
+import app.variants as variants
+
+def _setup(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(variants, "SOURCE_DIRS", {"uploads": uploads})
+    monkeypatch.setattr(variants, "VARIANTS_DIR", tmp_path / "variants")
+    monkeypatch.setattr(variants, "_variant_cache", None)
+    Image.new("RGBA", (1000, 500), (255, 0, 0, 128)).save(uploads / "p.png")
+    return uploads
+
+def test_generate_variants_all_widths_and_formats(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    written = variants.generate_variants("uploads", "p.png", widths=(160, 320, 2000), formats=["webp", "png"])
+    sizes = sorted({Image.open(p).size for p in written})
+    # Aspect kept; widths above the source are capped to it
+    assert sizes == [(160, 80), (320, 160), (1000, 500)]
+    assert len(written) == 6
+    # Already there: nothing to do
+    assert variants.generate_variants("uploads", "p.png", widths=(160,), formats=["webp"]) == []
+    variants.discard_variants("uploads", "p.png")
+    assert variants.get_variant_cache().stats()["entries"] == 0
+    assert not any(p.exists() for p in written)
+
+def test_get_variant_snaps_width_and_rejects_bad_names(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    path = variants.get_variant("uploads", "p.png", 200, "webp")
+    assert Image.open(path).size == (320, 160)
+    assert variants.get_variant("uploads", "../p.png", 200, "webp") is None
+    assert variants.get_variant("exports", "p.png", 200, "webp") is None
+
+def test_immutable_response_etag_roundtrip(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    path = variants.get_variant("uploads", "p.png", 160, "webp")
+    first = variants.immutable_file_response(path, "image/webp", None)
+    assert first.headers["cache-control"] == variants.IMMUTABLE
+    etag = first.headers["etag"]
+    assert etag.startswith('"')  # strong validator
+    assert variants.immutable_file_response(path, "image/webp", etag).status_code == 304
+
+def test_cutouts_revalidate(tmp_path):
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.testclient import TestClient
+    for name in ("p.png", "nobg_p.png"):
+        Image.new("RGBA", (10, 10)).save(tmp_path / name)
+    app = Starlette(routes=[Mount("/uploads", variants.ImmutableStaticFiles(directory=str(tmp_path)))])
+    client = TestClient(app)
+    assert client.get("/uploads/p.png").headers["cache-control"] == variants.IMMUTABLE
+    # Re-running background removal rewrites the same name
+    assert client.get("/uploads/nobg_p.png").headers["cache-control"] == variants.REVALIDATE
+    assert variants.cache_control_for("nobg_p.png") == variants.REVALIDATE
+
+def test_variants_are_size_bounded(tmp_path, monkeypatch):
+    uploads = _setup(tmp_path, monkeypatch)
+    variants.generate_variants("uploads", "p.png", widths=(160,), formats=["png"])
+    size = variants.get_variant_cache().stats()["bytes"]
+    monkeypatch.setattr(variants, "VARIANTS_MAX_MB", size * 2.5 / (1024 * 1024))
+    monkeypatch.setattr(variants, "_variant_cache", None)
+    # Rewriting the source starts a new generation; the old one ages out
+    for i in range(4):
+        Image.new("RGBA", (1000, 500), (i, 0, 0, 128)).save(uploads / "p.png")
+        os.utime(uploads / "p.png", ns=(i * 10**9, i * 10**9))
+        variants.generate_variants("uploads", "p.png", widths=(160,), formats=["png"])
+    stats = variants.get_variant_cache().stats()
+    assert stats["entries"] <= 2 and stats["evictions"] >= 2
+
+def test_negotiate_format_honours_q_values():
+    src = variants.Path("p.png")
+    if "webp" not in variants.BACKGROUND_FORMATS:
+        return
+    assert variants.negotiate_format("image/webp,*/*", src) == "webp"
+    assert variants.negotiate_format("image/webp;q=0, image/png", src) == "png"
+    assert variants.negotiate_format("*/*", src) == "png"
+    if "avif" in variants.BACKGROUND_FORMATS:
+        assert variants.negotiate_format("image/avif;q=0.5,image/webp", src) == "webp"
+        assert variants.negotiate_format("image/avif,image/webp", src) == "avif"
@@ -0,0 +1,26 @@
+import asyncio
+import operator
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import pytest
+from app.workers import WorkerPool, PoolBusy
+
+def test_pool_runs_in_worker():
+    pool = WorkerPool("test", max_workers=1, max_pending=2)
+    try:
+        assert asyncio.run(pool.run(operator.add, 2, 3)) == 5
+        assert pool.stats()["completed"] == 1
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
+
+def test_pool_rejects_when_full():
+    pool = WorkerPool("test", max_workers=1, max_pending=1)
+    pool.reserve()
+    with pytest.raises(PoolBusy):
+        pool.reserve()
+    assert pool.stats()["rejected"] == 1
+    pool.release()
+    pool.reserve()